@@ -1,20 +1,15 @@
-
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import json
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
-import streamlit as st
-from src.predict import predict_next_3_days
 from datetime import datetime, timedelta
-import plotly.io as pio
-import plotly.express as px
-from src.create_lime import generate_lime
+from src.locations import load_locations, location_path
 
+# Heavy modules are imported inside the tab that uses them. Streamlit runs every tab
+# body on every rerun, so plotly and the model runtime still load on the first run,
+# only after the page header has painted (and once per process, reruns reuse them).
+# The one import actually skipped is LIME, loaded only when its explanation is not
+# cached. python -m src.startup_report checks this in CI.
 
 # ------------------------------
 # Background (Light Overlay)
@@ -69,30 +64,42 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# ------------------------------
+# Location (locations.json). Every path below is resolved against the location's root;
+# models are cached per model directory, so switching back and forth reloads nothing.
+# ------------------------------
+locations = load_locations()
+location_id = st.sidebar.selectbox("📍 Location", list(locations), format_func=lambda loc_id: locations[loc_id]["name"])
+location = locations[location_id]
+root = location["root"]
+
 # ------------------------------
 # Header
 # ------------------------------
 st.markdown(
-    """
+    f"""
     <div style='text-align: center; color: black; margin-top: -0.1rem; margin-bottom: -0.1rem;'>
-        <h1 style='margin: -0.1;'>📍 Pearls' Karachi Air Quality Index</h1>
+        <h1 style='margin: -0.1;'>📍 Pearls' {location['name']} Air Quality Index</h1>
         <hr style='border: 3px double black; width: 60%; margin: -0.1rem auto 0;'>
     </div>
     """,
     unsafe_allow_html=True
 )
 
-pio.templates.default = "plotly_white"
 # ------------------------------
 # Load data
 # ------------------------------
 @st.cache_data
-def load_data():
-    df = pd.read_csv("processed_data/daily_karachi_preprocessed.csv")
+def load_data(path):
+    df = pd.read_csv(path)
     df["date"] = pd.to_datetime(df["date"])
     return df
 
-df = load_data()
+data_path = location_path(root, "processed_data/daily_karachi_preprocessed.csv")
+if not os.path.exists(data_path):
+    st.warning(f"⏳ No data for {location['name']} yet: its history is backfilled and its models trained by the next pipeline run.")
+    st.stop()
+df = load_data(data_path)
 # ------------------------------
 # Create tabs
 #--------------------------
@@ -123,8 +130,18 @@ tabs = st.tabs(["📊 Overview", "📈 AQI Trends", "💨 Pollutants & Lime Feat
 # TAB 0: Overview 
 # ----------------
 with tabs[0]:
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    from src.predict import get_forecast, FORECAST_ARTIFACT_PATH
+    from src.predict_hourly import get_hourly_forecast, HOURLY_PREDICTIONS_PATH
+    from src.hourly_features import HOURLY_MODEL_DIR, load_hourly
+    from src.fetch_data import HOURLY_PATH
+    from src.model_registry import LSTM_MODEL_DIR
+
+    pio.templates.default = "plotly_white"
+
     latest_row = df.sort_values("date").iloc[-1]
-    forecast_df = predict_next_3_days()
+    forecast_df = get_forecast(data_path, location_path(root, LSTM_MODEL_DIR), location_path(root, FORECAST_ARTIFACT_PATH))
 
     st.markdown(f"<h3 style='text-align: center; color: black;'>Date: {latest_row['date'].strftime('%d %B %Y')}</h3>", unsafe_allow_html=True)
 
@@ -259,12 +276,39 @@ with tabs[0]:
         """, unsafe_allow_html=True)
     st.markdown("<hr style='border: 1px solid black;'>", unsafe_allow_html=True)
 
+    # ------------------------------
+    # Intraday: last 72 observed hours + next 72 forecast hours (hourly model)
+    # ------------------------------
+    st.markdown("<h1 style='text-align: center; color: black;'>|| Next 72-Hour AQI Forecast ||</h1>", unsafe_allow_html=True)
+    hourly_path = location_path(root, HOURLY_PATH)
+    hourly_forecast = get_hourly_forecast(hourly_path, location_path(root, HOURLY_MODEL_DIR),
+                                          location_path(root, HOURLY_PREDICTIONS_PATH))
+    if hourly_forecast is None:
+        st.info("ℹ️ No hourly model yet. Run `python -m src.hourly_model_training` to train it.")
+    else:
+        observed = load_hourly(hourly_path, n_rows=72)
+        fig_hourly = go.Figure()
+        fig_hourly.add_trace(go.Scatter(x=observed["time"], y=observed["AQI"], mode="lines",
+                                        name="Observed AQI", line=dict(color="black", width=2)))
+        fig_hourly.add_trace(go.Scatter(x=pd.to_datetime(hourly_forecast["Time"]), y=hourly_forecast["Predicted_AQI"],
+                                        mode="lines", name="Forecast AQI", line=dict(color="crimson", width=3, dash="dash")))
+        fig_hourly.update_layout(
+            xaxis_title="Hour", yaxis_title="AQI", hovermode="x unified",
+            paper_bgcolor='rgba(0,0,0,0)', font=dict(color="black", size=16),
+            legend=dict(orientation="h", y=1.1, x=0.5, xanchor="center"),
+            margin=dict(t=40, b=20), height=420
+        )
+        st.plotly_chart(fig_hourly, use_container_width=True)
+    st.markdown("<hr style='border: 1px solid black;'>", unsafe_allow_html=True)
+
 # ----------- 
 # TAB 1: AQI Trends 
 # ----------- 
 
 with tabs[1]:
-    st.markdown(f"<h1 style='text-align: center; color: black;'>||Karachi AQI & Pollutants Over Time||</h1>", unsafe_allow_html=True)
+    from src.charts import get_figure
+
+    st.markdown(f"<h1 style='text-align: center; color: black;'>||{location['name']} AQI & Pollutants Over Time||</h1>", unsafe_allow_html=True)
 
     # -------------------------
     # Time Filter Title Styling
@@ -322,101 +366,8 @@ with tabs[1]:
         if st.button("All Data"):
             time_filter = None  # No filter — show all data
 
-    #-------
-    latest_date = df["date"].max()
-
-    if time_filter:
-        filtered_df = df[df["date"] >= latest_date - pd.Timedelta(days=time_filter)]
-    else:
-        filtered_df = df.copy()
-
-    # Create the figure
-    fig = go.Figure()
-
-    # AQI Limit Bands (source: EPA)
-    aqi_bands = [
-        {"min": 0, "max": 50, "color": "#00e400",'label': 'Good'},
-        {"min": 51, "max": 100, "color": "#ffff00", 'label': 'Moderate'},
-        {"min": 101, "max": 150, "color": "#ff7e00", 'label': 'Unhealthy for Sensitive Groups'},
-        {"min": 151, "max": 200, "color": "#ff0000", 'label': 'Unhealthy'},
-        {"min": 201, "max": 300, "color": "#8f3f97", 'label': 'Very Unhealthy'},
-        {"min": 301, "max": 500, "color": "#7e0023", 'label': 'Hazardous'},
-    ]
-
-    
-    for band in aqi_bands:
-        fig.add_shape(
-            type="rect",
-            xref="paper",  # span entire x-axis
-            yref="y",
-            x0=0,
-            x1=1,
-            y0=band['min'],
-            y1=band['max'],
-            fillcolor=band['color'],
-            opacity=0.1,
-            layer="below",
-            line_width=0,
-        )
-        fig.add_annotation(
-            xref="paper",
-            yref="y",
-            x=1.01,
-            y=(band['min'] + band['max']) / 2,
-            text=band['label'],
-            showarrow=False,
-            font=dict(color=band['color'], size=12),
-            bgcolor="rgba(255,255,255,0.6)"
-        )
-
-    # Add AQI line chart
-    fig.add_trace(go.Scatter(
-        x=filtered_df["date"],
-        y=filtered_df["AQI"],
-        mode="lines+markers",
-        line=dict(color="#3a0ca3", width=4),
-        marker=dict(size=6),
-        name="AQI"
-    ))
-
-    # ✅ Update layout with plotly_white template
-    fig.update_layout(
-        template="plotly_white",  # ✅ Force white theme
-        height=800,
-        title=dict(
-            text="📈 AQI Trends Over Time",
-            font=dict(size=24, color="black"),
-            x=0.5
-        ),
-        xaxis=dict(
-            title=dict(text="Date", font=dict(color="black", size=18)),
-            showgrid=True,
-            gridcolor="lightgrey",
-            tickfont=dict(color="black")
-        ),
-        yaxis=dict(
-            title=dict(text="Air Quality Index (AQI)", font=dict(color="black", size=18)),
-            showgrid=True,
-            gridcolor="lightgrey",
-            tickfont=dict(color="black"),
-            range=[0, 500]
-        ),
-        font=dict(
-            family="Arial",
-            size=16,
-            color="black"
-        ),
-        paper_bgcolor="white",
-        plot_bgcolor="white",
-        margin=dict(t=60, b=40, l=60, r=30),
-        hoverlabel=dict(
-            font=dict(color='black', size=14),
-            bgcolor="white"
-        )
-    )
-
-    # Show in Streamlit
-    st.plotly_chart(fig, use_container_width=True)
+    # Downsampled to the visible range, built once per data version (src/charts.py)
+    st.plotly_chart(get_figure(data_path, "aqi", time_filter), use_container_width=True)
     st.markdown("<hr style='border: 1px solid black;'>", unsafe_allow_html=True)
 
     # --------------------------------------
@@ -466,94 +417,21 @@ with tabs[1]:
         if st.button("Percentage (%)"):
             view_mode = "Percentage (%)"
 
-    pollutants = ['PM2.5', 'PM10', 'NO2', 'O3', 'CO', 'SO2']
-
-    if view_mode == "Concentration (μg/m³)":
-        fig = px.line(df, x="date", y=pollutants,
-                      labels={"value": "Concentration (μg/m³)", "variable": "Pollutant", "date": "Date"},
-                      title="Pollutant Concentrations Over Time")
-
-    else:  # Percentage view
-        df_pct = df.copy()
-        df_pct["Total"] = df_pct[pollutants].sum(axis=1)
-        for col in pollutants:
-            df_pct[col] = (df_pct[col] / df_pct["Total"]) * 100
-
-        fig = px.line(df_pct, x="date", y=pollutants,
-                      labels={"value": "Percentage (%)", "variable": "Pollutant", "date": "Date"},
-                      title="Pollutant Percentage Contribution Over Time")
-
-    
-    # Apply black color to all text elements
-    if view_mode == "Concentration (μg/m³)":
-        fig = px.line(
-            df,
-            x="date",
-            y=pollutants,
-            labels={"value": "Concentration (μg/m³)", "variable": "Pollutant", "date": "Date"},
-            title="Pollutant Concentrations Over Time"
-        )
-
-    else:  # Percentage view
-        df_pct = df.copy()
-        df_pct["Total"] = df_pct[pollutants].sum(axis=1)
-        for col in pollutants:
-            df_pct[col] = (df_pct[col] / df_pct["Total"]) * 100
-
-        fig = px.line(
-            df_pct,
-            x="date",
-            y=pollutants,
-            labels={"value": "Percentage (%)", "variable": "Pollutant", "date": "Date"},
-            title="Pollutant Percentage Contribution Over Time"
-        )
-
-    # ✅ Apply font and axis color styling here
-    fig.update_layout(
-        template="plotly_white",
-        height=800,
-        paper_bgcolor="white",
-        plot_bgcolor="white",
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.12,
-            xanchor="right",
-            x=1,
-            font=dict(
-                size=20,
-                color="black"
-            )),
-        title=dict(
-            font=dict(size=24, color="black"),
-            x=0.5
-        ),
-        xaxis=dict(
-            title=dict(text="Date", font=dict(color="black", size=24)),
-            tickfont=dict(color="black")
-        ),
-        yaxis=dict(
-            title=dict(
-                text="Concentration (μg/m³)" if view_mode == "Concentration (μg/m³)" else "Percentage (%)",
-                font=dict(color="black", size=24)
-            ),
-            tickfont=dict(color="black")
-        ),
-        font=dict(color="black")
-    )
-
-    fig.update_traces(line=dict(width=2))
-    st.plotly_chart(fig, use_container_width=True)
+    mode = "concentration" if view_mode == "Concentration (μg/m³)" else "percentage"
+    st.plotly_chart(get_figure(data_path, "pollutants", mode), use_container_width=True)
     st.markdown("<hr style='border: 1px solid black;'>", unsafe_allow_html=True)
     
 # -------------------
 # TAB 2: Pollutants 
 # --------------------- #
 with tabs[2]:
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.markdown(f"<h1 style='text-align: center; color: black;'>||Pollutants Contributions||</h1>", unsafe_allow_html=True)
 
     # Load data and define pollutants
-    df = load_data()
+    df = load_data(data_path)
     pollutants = ['PM2.5', 'PM10', 'NO2', 'O3', 'CO', 'SO2']
 
     # WHO safe limits
@@ -582,7 +460,7 @@ with tabs[2]:
         r=karachi_plot,
         theta=pollutants_labels,
         fill='toself',
-        name='Karachi Avg / WHO',
+        name=f"{location['name']} Avg / WHO",
         line_color='crimson'
     ))
     radar_fig.add_trace(go.Scatterpolar(
@@ -601,7 +479,7 @@ with tabs[2]:
         height=800,
         paper_bgcolor="white",
         plot_bgcolor="white",
-        title=dict(text="📊 Risk Ratio (Karachi Pollutants Avg vs WHO)", font=dict(size=24, color="black")),
+        title=dict(text=f"📊 Risk Ratio ({location['name']} Pollutants Avg vs WHO)", font=dict(size=24, color="black")),
         legend=dict(
             orientation="h", yanchor="bottom", y=-0.12, xanchor="right", x=1,
             font=dict(size=20, color="black")
@@ -620,7 +498,7 @@ with tabs[2]:
 
     # Pie chart for average composition
     pie_fig = px.pie(values=karachi_avg, names=pollutants,color=pollutants,
-                     title="Overall Karachi Pollutant Composition (Avg)",
+                     title=f"Overall {location['name']} Pollutant Composition (Avg)",
                      color_discrete_map=custom_colors,
                      hole=0.2)
     pie_fig.update_layout(title_font_color="black", title_font_size=20,height=800,
@@ -638,71 +516,132 @@ with tabs[2]:
     # Divider
     st.markdown("<hr style='border: 1px solid black;'>", unsafe_allow_html=True)
 
-    # ================== LIME Explanation ==================
-    # Show heading
-    st.markdown("<h1 style='text-align: center; color: black;'>|| LIME Features' Contributions ||</h1>", unsafe_allow_html=True)
-
-    # Call LIME generate function, get all outputs
-    result = generate_lime()
-    html_path = result['html_path']
-    csv_path = result['csv_path']
-    png_path = result['png_path']   
-    intercept = result['intercept']
-    pred_local = result['pred_local']
-
-    # Show intercept and prediction with black font and center alignment
-    intercept_scalar = float(intercept)
-    st.markdown(f"<h3 style='color: black; text-align: center;'>Intercept: {intercept_scalar:.4f}</h3>", unsafe_allow_html=True)
-
-    pred_local_scalar = float(pred_local)
-    st.markdown(f"<h3 style='color: black; text-align: center;'>Local Prediction: {pred_local_scalar:.4f}</h3>", unsafe_allow_html=True)
-
-    lime_df = pd.read_csv(csv_path)
-
-        # Plotly Horizontal Bar for LIME
-    fig_lime = px.bar(
-        lime_df,
-        x="Contribution",
-        y="Feature",
-        orientation="h",
-        color="Contribution",
-        color_continuous_scale=px.colors.diverging.RdBu,
-        title="LIME Features' Contributions",
-     )
-
-    # ✅ Apply same styling as reference chart
-    fig_lime.update_layout(
-        template="plotly_white",
-        height=800,
-        paper_bgcolor="white",
-        plot_bgcolor="white",
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.12,
-            xanchor="right",
-            x=1,
-            font=dict(size=24, color="black")
-        ),
-        title=dict(
-            font=dict(size=24, color="black"),
-            x=0.5
-        ),
-        xaxis=dict(
-            title=dict(text="Contribution to Prediction", font=dict(color="black", size=24)),
-            tickfont=dict(color="black")
-        ),
-        yaxis=dict(
-            title=dict(text="Feature", font=dict(color="black", size=24)),
-            tickfont=dict(color="black")
-        ),
-        font=dict(color="black")
+    # ================== Explanations ==================
+    explain_mode = st.radio(
+        "Explanation mode",
+        ["🧩 Sequence (whole 7-day window)", "🍋 LIME (latest day)"],
+        horizontal=True,
     )
-    st.plotly_chart(fig_lime, use_container_width=True)
 
-        # Download buttons
-    st.download_button("📄 Download LIME CSV", data=open(csv_path, "rb"), file_name="lime_explanation.csv")
-    st.download_button("🌐 View Full HTML", data=open(html_path, "rb"), file_name="lime_explanation.html")
+    if explain_mode.startswith("🧩"):
+        st.markdown("<h1 style='text-align: center; color: black;'>|| Window Contributions (Day × Feature) ||</h1>", unsafe_allow_html=True)
+
+        # Masked perturbations of the real input window, cached per model version
+        from src.sequence_explain import generate_sequence_explanation
+        seq_result = generate_sequence_explanation(root=root)
+        seq_df = seq_result["contributions_df"]
+
+        st.markdown(f"<h3 style='color: black; text-align: center;'>Forecast (t+1): {seq_result['prediction']:.2f} | Baseline: {seq_result['intercept']:.2f}</h3>", unsafe_allow_html=True)
+
+        heat = seq_df.pivot_table(index="Feature", columns="Day", values="Contribution", aggfunc="sum", sort=False)
+        limit = float(heat.abs().max().max()) or 1.0
+        fig_seq = px.imshow(
+            heat,
+            color_continuous_scale=px.colors.diverging.RdBu,
+            zmin=-limit,
+            zmax=limit,
+            aspect="auto",
+            title="Contribution of each day and feature to the forecast (AQI)",
+        )
+        fig_seq.update_layout(
+            template="plotly_white",
+            height=900,
+            paper_bgcolor="white",
+            plot_bgcolor="white",
+            title=dict(font=dict(size=24, color="black"), x=0.5),
+            font=dict(color="black")
+        )
+        st.plotly_chart(fig_seq, use_container_width=True)
+
+        totals = seq_df.groupby("Feature", sort=False)["Contribution"].sum().reset_index()
+        totals = totals.reindex(totals["Contribution"].abs().sort_values().index).tail(20)
+        fig_totals = px.bar(
+            totals,
+            x="Contribution",
+            y="Feature",
+            orientation="h",
+            color="Contribution",
+            color_continuous_scale=px.colors.diverging.RdBu,
+            title="Feature Contributions Summed Over the Window",
+        )
+        fig_totals.update_layout(
+            template="plotly_white",
+            height=700,
+            paper_bgcolor="white",
+            plot_bgcolor="white",
+            title=dict(font=dict(size=24, color="black"), x=0.5),
+            font=dict(color="black")
+        )
+        st.plotly_chart(fig_totals, use_container_width=True)
+
+        st.download_button("📄 Download Window Contributions CSV", data=open(seq_result["csv_path"], "rb"),
+                           file_name="sequence_explanation.csv")
+    else:
+        # Show heading
+        st.markdown("<h1 style='text-align: center; color: black;'>|| LIME Features' Contributions ||</h1>", unsafe_allow_html=True)
+
+        # Call LIME generate function, get all outputs (LIME itself is only imported on a cache miss)
+        from src.create_lime import generate_lime
+        result = generate_lime(root=root)
+        html_path = result['html_path']
+        csv_path = result['csv_path']
+        png_path = result['png_path']   
+        intercept = result['intercept']
+        pred_local = result['pred_local']
+
+        # Show intercept and prediction with black font and center alignment
+        intercept_scalar = float(intercept)
+        st.markdown(f"<h3 style='color: black; text-align: center;'>Intercept: {intercept_scalar:.4f}</h3>", unsafe_allow_html=True)
+
+        pred_local_scalar = float(pred_local)
+        st.markdown(f"<h3 style='color: black; text-align: center;'>Local Prediction: {pred_local_scalar:.4f}</h3>", unsafe_allow_html=True)
+
+        lime_df = pd.read_csv(csv_path)
+
+            # Plotly Horizontal Bar for LIME
+        fig_lime = px.bar(
+            lime_df,
+            x="Contribution",
+            y="Feature",
+            orientation="h",
+            color="Contribution",
+            color_continuous_scale=px.colors.diverging.RdBu,
+            title="LIME Features' Contributions",
+         )
+
+        # ✅ Apply same styling as reference chart
+        fig_lime.update_layout(
+            template="plotly_white",
+            height=800,
+            paper_bgcolor="white",
+            plot_bgcolor="white",
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=-0.12,
+                xanchor="right",
+                x=1,
+                font=dict(size=24, color="black")
+            ),
+            title=dict(
+                font=dict(size=24, color="black"),
+                x=0.5
+            ),
+            xaxis=dict(
+                title=dict(text="Contribution to Prediction", font=dict(color="black", size=24)),
+                tickfont=dict(color="black")
+            ),
+            yaxis=dict(
+                title=dict(text="Feature", font=dict(color="black", size=24)),
+                tickfont=dict(color="black")
+            ),
+            font=dict(color="black")
+        )
+        st.plotly_chart(fig_lime, use_container_width=True)
+
+            # Download buttons
+        st.download_button("📄 Download LIME CSV", data=open(csv_path, "rb"), file_name="lime_explanation.csv")
+        st.download_button("🌐 View Full HTML", data=open(html_path, "rb"), file_name="lime_explanation.html")
 
 #-----------
 # Tab 3: General INsights
@@ -805,9 +744,11 @@ with tabs[3]:
 # Tab 4: 🕒 Logs
 # ----------------------
 with tabs[4]:
+    from src.model_registry import LSTM_MODEL_DIR, model_version
+
     st.markdown(f"<h2 style='text-align: center; color: black;'>|| Pipeline Logs & Meta Data ||</h2>", unsafe_allow_html=True)
     
-    log_path = "lstm_model/update_log.txt"
+    log_path = location_path(root, "lstm_model/update_log.txt")
 
     def load_logs(log_path):
         if not os.path.exists(log_path):
@@ -836,6 +777,7 @@ with tabs[4]:
                 <li><strong>RMSE:</strong> {latest.get('RMSE', 'N/A')}</li>
                 <li><strong>R²:</strong> {latest.get('R2', 'N/A')}</li>
                 <li><strong>Samples (Train/Test):</strong> {latest.get('train_samples', 'N/A')} / {latest.get('test_samples', 'N/A')}</li>
+                <li><strong>Serving Model Version:</strong> {model_version(location_path(root, LSTM_MODEL_DIR))}</li>
             </ul>
         """, unsafe_allow_html=True)
 
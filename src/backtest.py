@@ -0,0 +1,100 @@
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from src.windowing import make_windows
+from src.preprocess_daily_data import get_season
+from src.model_registry import LSTM_MODEL_DIR, get_artifacts, predict_batch
+
+# -------------------
+# Configs & Paths
+# -------------------
+DATA_PATH = "processed_data/daily_karachi_preprocessed.csv"
+HORIZON = 3
+BACKTEST_ORIGINS = 365
+
+
+# -------------------
+# Forecasts from many origins at once
+# -------------------
+def forecast_origins(model, pipeline, X_windows, horizon=HORIZON):
+    # X_windows: (n_origins, seq_len, n_features) scaled inputs -> (n_origins, horizon) AQI.
+    # Direct head: one model call for every origin. Autoregressive head: one call per
+    # step, each batched over all origins; the prediction is fed back as the next day's AQI.
+    # Also serves predict.py, where the "origins" are the latest windows of one or more locations.
+    if pipeline.horizon >= horizon:
+        return pipeline.inverse_target(predict_batch(model, X_windows))[:, :horizon]
+
+    aqi_idx = pipeline.feature_columns.index("AQI")
+    seq = np.array(X_windows, dtype=float)
+    preds = np.empty((len(seq), horizon))
+    for k in range(horizon):
+        preds[:, k] = pipeline.inverse_target(predict_batch(model, seq))[:, 0]
+        next_input = seq[:, -1].copy()
+        next_input[:, aqi_idx] = pipeline.scale_feature("AQI", preds[:, k])
+        seq = np.concatenate([seq[:, 1:], next_input[:, np.newaxis]], axis=1)
+    return preds
+
+
+def _errors(actual, predicted):
+    err = predicted - actual
+    return {
+        "MAE": round(float(np.mean(np.abs(err))), 2),
+        "RMSE": round(float(np.sqrt(np.mean(err ** 2))), 2),
+        "n": int(err.size),
+    }
+
+
+def backtest(model, pipeline, df, n_origins=BACKTEST_ORIGINS, horizon=HORIZON):
+    # Walk-forward evaluation: each origin is the last day of an input window, forecast
+    # for the following `horizon` days and compared with the AQI observed on them.
+    # Uses the last n_origins origins whose targets are all known.
+    X_all = pipeline.transform(df)
+    X_win, y_win = make_windows(X_all, pipeline.seq_len, df["AQI"].to_numpy(dtype=float), horizon)
+    n_origins = min(n_origins, len(X_win))
+    X_win, actual = X_win[-n_origins:], y_win[-n_origins:]
+
+    predicted = forecast_origins(model, pipeline, X_win, horizon)
+
+    # Origin i of the selection is row (len(X_win) - n_origins + i) + seq_len - 1 of df
+    first_row = len(df) - horizon - n_origins
+    origin_dates = pd.to_datetime(df["date"].iloc[first_row:first_row + n_origins]).reset_index(drop=True)
+    seasons = origin_dates.dt.month.map(get_season).to_numpy()
+
+    return {
+        "origins": n_origins,
+        "first_origin": origin_dates.iloc[0].strftime("%Y-%m-%d"),
+        "last_origin": origin_dates.iloc[-1].strftime("%Y-%m-%d"),
+        "overall": _errors(actual, predicted),
+        "by_horizon": {f"t+{k + 1}": _errors(actual[:, k], predicted[:, k]) for k in range(horizon)},
+        "by_season": {season: _errors(actual[seasons == season], predicted[seasons == season])
+                      for season in ["Winter", "Spring", "Summer", "Fall"] if (seasons == season).any()},
+    }
+
+
+def print_report(result, title="Backtest"):
+    print(f"\n📐 {title}: {result['origins']} origins, {result['first_origin']} .. {result['last_origin']}")
+    print(f"   overall  MAE {result['overall']['MAE']:7.2f}  RMSE {result['overall']['RMSE']:7.2f}")
+    for name, errs in list(result["by_horizon"].items()) + list(result["by_season"].items()):
+        print(f"   {name:<8} MAE {errs['MAE']:7.2f}  RMSE {errs['RMSE']:7.2f}  (n={errs['n']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the serving model")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--model-dir", default=LSTM_MODEL_DIR)
+    parser.add_argument("--origins", type=int, default=BACKTEST_ORIGINS)
+    parser.add_argument("--output", default=None, help="also write the result as JSON")
+    args = parser.parse_args(argv)
+
+    artifacts = get_artifacts(args.model_dir)
+    result = backtest(artifacts["model"], artifacts["pipeline"], pd.read_csv(args.data), args.origins)
+    print_report(result, f"Backtest of model {artifacts['version']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Backtest saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
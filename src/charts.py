@@ -0,0 +1,224 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# -------------------
+# Configs
+# -------------------
+MAX_POINTS = 500        # per trace sent to the browser, whatever the visible range
+FIGURE_CACHE_SIZE = 32  # figures kept in memory, least recently used are evicted
+POLLUTANTS = ['PM2.5', 'PM10', 'NO2', 'O3', 'CO', 'SO2']
+POLLUTANT_MODES = {
+    "concentration": ("Concentration (μg/m³)", "Pollutant Concentrations Over Time"),
+    "percentage": ("Percentage (%)", "Pollutant Percentage Contribution Over Time"),
+}
+
+# AQI Limit Bands (source: EPA)
+AQI_BANDS = [
+    {"min": 0, "max": 50, "color": "#00e400", 'label': 'Good'},
+    {"min": 51, "max": 100, "color": "#ffff00", 'label': 'Moderate'},
+    {"min": 101, "max": 150, "color": "#ff7e00", 'label': 'Unhealthy for Sensitive Groups'},
+    {"min": 151, "max": 200, "color": "#ff0000", 'label': 'Unhealthy'},
+    {"min": 201, "max": 300, "color": "#8f3f97", 'label': 'Very Unhealthy'},
+    {"min": 301, "max": 500, "color": "#7e0023", 'label': 'Hazardous'},
+]
+
+# -------------------
+# In-memory state, keyed on the data file's (mtime, size): series are computed once
+# per data version, figures once per (version, chart, range/mode). Streamlit serves
+# sessions from several threads: both caches are only read and written under _lock.
+# -------------------
+_series = {}              # data_path -> (stamp, series)
+_figures = OrderedDict()  # (data_path, chart, option, max_points) -> (stamp, go.Figure)
+_lock = threading.Lock()
+
+
+# -------------------
+# Largest-Triangle-Three-Buckets downsampling
+# -------------------
+def lttb(x, y, n_out):
+    # -> indices of the n_out points that best keep the shape of y(x); first and last
+    # points are always kept, and one point per bucket in between (peaks survive)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # n_out - 2 buckets over rows 1 .. n-2
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        following = slice(end, edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        avg_x, avg_y = x[following].mean(), y[following].mean()
+        # Twice the area of the triangle (kept point, candidate, next bucket's average)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        kept[i + 1] = a
+    return kept
+
+
+# -------------------
+# Series, precomputed once per data version
+# -------------------
+def data_stamp(data_path):
+    st = os.stat(data_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def build_series(df):
+    # -> {"dates", "x" (days, float), "AQI", "concentration": {pollutant: values}, "percentage": {...}}
+    values = df[POLLUTANTS].to_numpy(dtype=float)
+    total = values.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentage = np.where(total > 0, values / total * 100, np.nan)
+    dates = pd.to_datetime(df["date"])
+    return {
+        "dates": dates.dt.strftime("%Y-%m-%d").to_numpy(),
+        "x": dates.to_numpy().astype("datetime64[D]").astype(float),
+        "AQI": df["AQI"].to_numpy(dtype=float),
+        "concentration": dict(zip(POLLUTANTS, values.T)),
+        "percentage": dict(zip(POLLUTANTS, percentage.T)),
+    }
+
+
+def get_series(data_path):
+    stamp = data_stamp(data_path)
+    with _lock:
+        cached = _series.get(data_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    series = build_series(pd.read_csv(data_path, usecols=["date", "AQI"] + POLLUTANTS))
+    with _lock:
+        _series[data_path] = (stamp, series)
+    return series
+
+
+def _visible(series, days):
+    # Rows of the last `days` days (None: all)
+    if not days:
+        return slice(0, len(series["x"]))
+    return slice(int(np.searchsorted(series["x"], series["x"][-1] - days)), len(series["x"]))
+
+
+def _downsample(series, rows, y, max_points):
+    x = series["x"][rows]
+    kept = lttb(x, y[rows], max_points)
+    return series["dates"][rows][kept], np.round(y[rows][kept], 2)
+
+
+# -------------------
+# Figures
+# -------------------
+def aqi_trend_figure(series, days=None, max_points=MAX_POINTS):
+    rows = _visible(series, days)
+    dates, aqi = _downsample(series, rows, series["AQI"], max_points)
+
+    fig = go.Figure()
+    for band in AQI_BANDS:
+        fig.add_shape(
+            type="rect", xref="paper", yref="y",  # span entire x-axis
+            x0=0, x1=1, y0=band['min'], y1=band['max'],
+            fillcolor=band['color'], opacity=0.1, layer="below", line_width=0,
+        )
+        fig.add_annotation(
+            xref="paper", yref="y", x=1.01, y=(band['min'] + band['max']) / 2,
+            text=band['label'], showarrow=False,
+            font=dict(color=band['color'], size=12), bgcolor="rgba(255,255,255,0.6)"
+        )
+
+    # Markers only while they stay readable
+    fig.add_trace(go.Scatter(
+        x=dates, y=aqi,
+        mode="lines+markers" if len(aqi) <= 120 else "lines",
+        line=dict(color="#3a0ca3", width=4),
+        marker=dict(size=6),
+        name="AQI"
+    ))
+
+    fig.update_layout(
+        template="plotly_white",
+        height=800,
+        title=dict(text="📈 AQI Trends Over Time", font=dict(size=24, color="black"), x=0.5),
+        xaxis=dict(
+            title=dict(text="Date", font=dict(color="black", size=18)),
+            showgrid=True, gridcolor="lightgrey", tickfont=dict(color="black")
+        ),
+        yaxis=dict(
+            title=dict(text="Air Quality Index (AQI)", font=dict(color="black", size=18)),
+            showgrid=True, gridcolor="lightgrey", tickfont=dict(color="black"), range=[0, 500]
+        ),
+        font=dict(family="Arial", size=16, color="black"),
+        paper_bgcolor="white",
+        plot_bgcolor="white",
+        margin=dict(t=60, b=40, l=60, r=30),
+        hoverlabel=dict(font=dict(color='black', size=14), bgcolor="white")
+    )
+    return fig
+
+
+def pollutant_figure(series, mode="concentration", days=None, max_points=MAX_POINTS):
+    unit, title = POLLUTANT_MODES[mode]
+    rows = _visible(series, days)
+
+    fig = go.Figure()
+    for pollutant in POLLUTANTS:
+        dates, values = _downsample(series, rows, series[mode][pollutant], max_points)
+        fig.add_trace(go.Scatter(
+            x=dates, y=values, mode="lines", name=pollutant, line=dict(width=2),
+            hovertemplate=f"Pollutant={pollutant}<br>Date=%{{x}}<br>{unit}=%{{y}}<extra></extra>",
+        ))
+
+    fig.update_layout(
+        template="plotly_white",
+        height=800,
+        paper_bgcolor="white",
+        plot_bgcolor="white",
+        legend=dict(
+            title=dict(text="Pollutant"),
+            orientation="h", yanchor="bottom", y=-0.12, xanchor="right", x=1,
+            font=dict(size=20, color="black")
+        ),
+        title=dict(text=title, font=dict(size=24, color="black"), x=0.5),
+        xaxis=dict(
+            title=dict(text="Date", font=dict(color="black", size=24)),
+            tickfont=dict(color="black")
+        ),
+        yaxis=dict(
+            title=dict(text=unit, font=dict(color="black", size=24)),
+            tickfont=dict(color="black")
+        ),
+        font=dict(color="black")
+    )
+    return fig
+
+
+# -------------------
+# Cached figures (what the dashboard hands to st.plotly_chart)
+# -------------------
+def get_figure(data_path, chart, option=None, max_points=MAX_POINTS):
+    # chart: "aqi" (option: last N days, None = all) or "pollutants" (option: mode).
+    # Returns a shared go.Figure: st.plotly_chart serializes it without re-validating,
+    # callers must not modify it.
+    stamp = data_stamp(data_path)
+    key = (data_path, chart, option, max_points)
+    with _lock:
+        cached = _figures.get(key)
+        if cached is not None and cached[0] == stamp:
+            _figures.move_to_end(key)
+            return cached[1]
+
+    # Built outside the lock: other charts keep being served meanwhile
+    series = get_series(data_path)
+    if chart == "aqi":
+        fig = aqi_trend_figure(series, option, max_points)
+    else:
+        fig = pollutant_figure(series, option, max_points=max_points)
+    with _lock:
+        _figures[key] = (stamp, fig)
+        _figures.move_to_end(key)
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+    return fig
@@ -1,50 +1,221 @@
 import os
+import json
+import shutil
+import time
+import tempfile
+import hashlib
+import argparse
 import numpy as np
 import pandas as pd
-import joblib
-from lime import lime_tabular
-from tensorflow.keras.models import load_model
-import plotly.express as px  # Import here for plotly figure
-
-def generate_lime():
-    LSTM_MODEL_DIR = "lstm_model"
-    MODEL_PATH = os.path.join(LSTM_MODEL_DIR, "lstm_aqi_model.keras")
-    SCALER_X_PATH = os.path.join(LSTM_MODEL_DIR, "scaler_X.pkl")
-    DATA_PATH = "processed_data/daily_karachi_preprocessed.csv"
-    SEQ_LEN = 7
-    SAVE_DIR = "lime_explanations"
-    os.makedirs(SAVE_DIR, exist_ok=True)
-
-    model = load_model(MODEL_PATH)
-    scaler_X = joblib.load(SCALER_X_PATH)
-
-    df = pd.read_csv(DATA_PATH)
-    features = [
-        'AQI', 'PM10', 'NO2', 'SO2', 'O3', 'Temperature', 'Humidity',
-        'Precipitation', 'month', 'log_PM2.5', 'log_CO', 'season_Spring',
-        'season_Summer', 'season_Winter', 'weekday_1', 'weekday_2', 'weekday_3',
-        'weekday_4', 'weekday_5', 'weekday_6', 'AQI_t+1', 'AQI_t+2', 'AQI_t+3',
-        'AQI_lag_1', 'AQI_lag_2', 'AQI_roll_mean_3', 'AQI_roll_std_3',
-        'AQI_diff'
-    ] + [col for col in df.columns if col.startswith("season_") or col.startswith("weekday_")]
-
-    X_all = scaler_X.transform(df[features])
-    X_train = X_all[:-SEQ_LEN]
-    X_test = X_all[-SEQ_LEN:]
-
-    explainer = lime_tabular.LimeTabularExplainer(
-        X_train,
-        feature_names=features,
-        verbose=False,
-        mode='regression'
-    )
+from datetime import datetime
+from src.model_registry import LSTM_MODEL_DIR, get_artifacts, model_version, predict_batch
+from src.locations import location_path
+from src.feature_pipeline import FEATURE_COLUMNS
+
+# -------------------
+# Configs & Paths
+# -------------------
+DATA_PATH = "processed_data/daily_karachi_preprocessed.csv"
+SAVE_DIR = "lime_explanations"
+CACHE_DIR = os.path.join(SAVE_DIR, "cache")
+CACHE_SIZE = 8  # explanations kept on disk, least recently used are evicted
+
+CSV_NAME = "lime_explanation.csv"
+HTML_NAME = "lime_explanation.html"
+PNG_NAME = "lime_explanation.png"
+META_NAME = "meta.json"
+TMP_PREFIX = ".tmp-"  # entries being written
+
+# Explanation engine
+NUM_SAMPLES = 5000       # perturbed rows LIME fits its local model on
+NUM_FEATURES = 20
+BACKGROUND_SIZE = None   # k-means summarize the history to this many rows (None = full history)
+RANDOM_STATE = 0         # fixed, so a cached explanation equals a recomputed one
+
+# In-process explainers, keyed by (model version, background): the Streamlit app
+# reuses one across reruns instead of recomputing the training statistics
+_explainers = {}
+
+
+# -------------------
+# Explanation cache
+# -------------------
+def cache_key(version, last_row, config=None):
+    # (model version, explained input row, engine config) -> cache entry name
+    h = hashlib.sha256(version.encode())
+    h.update(np.ascontiguousarray(last_row, dtype=np.float64).tobytes())
+    if config:
+        h.update(json.dumps(config, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+def _result_from_entry(entry_dir, meta):
+    csv_path = os.path.join(entry_dir, CSV_NAME)
+    return {
+        "intercept": meta["intercept"],
+        "pred_local": meta["pred_local"],
+        "features_df": pd.read_csv(csv_path),
+        "csv_path": csv_path,
+        "html_path": os.path.join(entry_dir, HTML_NAME),
+        "png_path": os.path.join(entry_dir, PNG_NAME),
+        "cached": True,
+        "explain_seconds": meta.get("explain_seconds"),
+        "config": meta.get("config"),
+    }
+
+
+def load_cached(key, cache_dir=CACHE_DIR):
+    entry_dir = os.path.join(cache_dir, key)
+    meta_path = os.path.join(entry_dir, META_NAME)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    os.utime(meta_path)  # mark as recently used
+    return _result_from_entry(entry_dir, meta)
+
+
+def new_entry_dir(cache_dir):
+    # Private temp dir per writer: two sessions missing the same key never share one
+    os.makedirs(cache_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix=TMP_PREFIX, dir=cache_dir)
+
+
+def publish_entry(tmp_dir, entry_dir):
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        # Another session published the same entry in between; keep theirs
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def restore_outputs(result, save_dir, files):
+    # Cache hit: copy the entry's files over the stage's top-level outputs (what the app and
+    # README point to), each replaced atomically; the result then points at the top-level files
+    for path_key, name in files:
+        path = os.path.join(save_dir, name)
+        fd, tmp_path = tempfile.mkstemp(prefix=TMP_PREFIX, dir=save_dir)
+        os.close(fd)
+        shutil.copyfile(result[path_key], tmp_path)
+        os.replace(tmp_path, path)
+        result[path_key] = path
+    return result
+
+
+def store_cached(key, result, version, cache_dir=CACHE_DIR, cache_size=CACHE_SIZE):
+    entry_dir = os.path.join(cache_dir, key)
+    tmp_dir = new_entry_dir(cache_dir)
+
+    for path_key, name in [("csv_path", CSV_NAME), ("html_path", HTML_NAME), ("png_path", PNG_NAME)]:
+        shutil.copyfile(result[path_key], os.path.join(tmp_dir, name))
+    meta = {
+        "model_version": version,
+        "intercept": float(result["intercept"]),
+        "pred_local": float(np.ravel(result["pred_local"])[0]),
+        "explain_seconds": result["explain_seconds"],
+        "config": result["config"],
+        "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(os.path.join(tmp_dir, META_NAME), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    publish_entry(tmp_dir, entry_dir)
+    evict(cache_dir, cache_size)
+
+
+def evict(cache_dir=CACHE_DIR, cache_size=CACHE_SIZE):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.startswith(TMP_PREFIX):
+            continue  # being written by another session
+        meta_path = os.path.join(cache_dir, name, META_NAME)
+        if os.path.exists(meta_path):
+            entries.append((os.path.getmtime(meta_path), name))
+    entries.sort(reverse=True)
+    for _, name in entries[cache_size:]:
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        print(f"🗑️ Evicted cached explanation {name}")
+
+
+# -------------------
+# LIME explanation
+# -------------------
+def summarize_background(X, size):
+    # k-means centroids stand in for the full history when it is large
+    if size is None or len(X) <= size:
+        return X
+    from sklearn.cluster import KMeans
+    return KMeans(n_clusters=size, n_init=1, random_state=RANDOM_STATE).fit(X).cluster_centers_
+
+
+def get_explainer(version, pipeline, X_background, background_size):
+    from lime import lime_tabular
+
+    # Keyed on the background's content: new data with the same number of rows must not
+    # reuse the training statistics of the old data
+    data_hash = hashlib.sha256(np.ascontiguousarray(X_background).tobytes()).hexdigest()[:16]
+    key = (version, data_hash, background_size)
+    if key not in _explainers:
+        _explainers.clear()  # one model / data version at a time
+        _explainers[key] = lime_tabular.LimeTabularExplainer(
+            summarize_background(X_background, background_size),
+            feature_names=pipeline.feature_columns,
+            verbose=False,
+            mode='regression',
+            random_state=RANDOM_STATE,
+        )
+    return _explainers[key]
+
+
+def generate_lime(use_cache=True, num_samples=NUM_SAMPLES, num_features=NUM_FEATURES,
+                  background_size=BACKGROUND_SIZE, root="."):
+    # root: the location whose data/model/outputs to use (see src/locations.py)
+    save_dir = location_path(root, SAVE_DIR)
+    model_dir = location_path(root, LSTM_MODEL_DIR)
+    cache_dir = location_path(root, CACHE_DIR)
+    os.makedirs(save_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    df = pd.read_csv(location_path(root, DATA_PATH))
+
+    # Cache lookup needs only the model hash and the raw last row, no TensorFlow
+    version = model_version(model_dir)
+    config = {"num_samples": num_samples, "num_features": num_features, "background_size": background_size}
+    key = cache_key(version, df[FEATURE_COLUMNS].iloc[-1].to_numpy(dtype=np.float64), config)
+    if use_cache:
+        cached = load_cached(key, cache_dir)
+        if cached is not None:
+            restore_outputs(cached, save_dir, [("csv_path", CSV_NAME), ("html_path", HTML_NAME),
+                                               ("png_path", PNG_NAME)])
+            cached["seconds"] = round(time.perf_counter() - start, 2)
+            return cached
+
+    # plotly is only needed on a cache miss
+    import plotly.express as px
+
+    artifacts = get_artifacts(model_dir)
+    model = artifacts["model"]
+    pipeline = artifacts["pipeline"]
+    seq_len = pipeline.seq_len
+
+    X_all = pipeline.transform(df)
+    X_train = X_all[:-seq_len]
+    X_test = X_all[-seq_len:]
+
+    explainer = get_explainer(version, pipeline, X_train, background_size)
     sample_last = X_test[-1].reshape(1, -1)
 
     def predict_fn(x):
-        seq = np.repeat(x[:, np.newaxis, :], SEQ_LEN, axis=1)
-        return model.predict(seq).reshape(-1,)
+        # Each perturbed row repeated over the window (a view, not a copy), one direct model call
+        seq = np.broadcast_to(x[:, np.newaxis, :], (len(x), seq_len, x.shape[1]))
+        return predict_batch(model, seq)[:, 0]  # t+1 output for the multi-horizon head
 
-    exp = explainer.explain_instance(sample_last[0], predict_fn, num_features=20)
+    explain_start = time.perf_counter()
+    exp = explainer.explain_instance(sample_last[0], predict_fn, num_features=num_features,
+                                     num_samples=num_samples)
+    explain_seconds = time.perf_counter() - explain_start
+    print(f"⏱️ LIME explanation: {explain_seconds:.2f}s ({num_samples} samples)")
 
     # Get intercept and local prediction
     intercept = exp.intercept[0]
@@ -52,8 +223,8 @@ def generate_lime():
 
 
     # Save explanation files
-    csv_path = os.path.join(SAVE_DIR, "lime_explanation.csv")
-    html_path = os.path.join(SAVE_DIR, "lime_explanation.html")
+    csv_path = os.path.join(save_dir, CSV_NAME)
+    html_path = os.path.join(save_dir, HTML_NAME)
     exp.save_to_file(html_path)
 
     lime_df = pd.DataFrame(exp.as_list(), columns=["Feature", "Contribution"])
@@ -78,26 +249,45 @@ def generate_lime():
         yaxis=dict(title="Feature", tickfont=dict(color="black")),
         font=dict(color="black")
     )
-    png_path = os.path.join(SAVE_DIR, "lime_explanation.png")
+    png_path = os.path.join(save_dir, PNG_NAME)
     fig.write_image(png_path, scale=3)
 
     print(f"Saved Plotly PNG to {png_path}")
 
-    return {
+    result = {
         "intercept": intercept,
         "pred_local": pred_local,
         "features_df": lime_df,
         "csv_path": csv_path,
         "html_path": html_path,
-        "png_path": png_path
+        "png_path": png_path,
+        "cached": False,
+        "seconds": round(time.perf_counter() - start, 2),  # wall time incl. files, excl. cache hits
+        "explain_seconds": round(explain_seconds, 2),
+        "config": config,
     }
+    store_cached(key, result, version, cache_dir)
+    return result
 
 
-if __name__ == "__main__":
-    result = generate_lime()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LIME explanation of the latest prediction")
+    parser.add_argument("--num-samples", type=int, default=NUM_SAMPLES)
+    parser.add_argument("--num-features", type=int, default=NUM_FEATURES)
+    parser.add_argument("--background-size", type=int, default=BACKGROUND_SIZE,
+                        help="k-means summarize the history to this many rows")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = generate_lime(not args.no_cache, args.num_samples, args.num_features, args.background_size)
     print(f"Intercept: {result['intercept']}")
     print(f"Local Prediction: {result['pred_local']}")
     print(result['features_df'])
     print(f"CSV saved to: {result['csv_path']}")
     print(f"HTML saved to: {result['html_path']}")
     print(f"PNG saved to: {result['png_path']}")
+    print(f"⏱️ Wall time: {result['seconds']}s{' (cached)' if result['cached'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
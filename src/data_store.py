@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import hashlib
+import pandas as pd
+from src.fetch_data import VALUE_COLUMNS
+
+# -----------------------------
+# Configurable Paths
+# -----------------------------
+DB_PATH = "data/karachi_daily_aqi_weather.db"
+SEED_CSV_PATH = "data/karachi_daily_aqi_weather.csv"  # legacy full-rewrite file, used to seed the store
+TABLE = "daily"
+
+_COLUMNS_SQL = ", ".join(f'"{col}"' for col in VALUE_COLUMNS)
+
+
+# -----------------------------
+# Daily store: one row per date, date is the primary key
+# -----------------------------
+def connect(db_path=DB_PATH, seed_csv=SEED_CSV_PATH):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    is_new = not os.path.exists(db_path)
+
+    conn = sqlite3.connect(db_path)
+    columns = ", ".join(f'"{col}" REAL' for col in VALUE_COLUMNS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (date TEXT PRIMARY KEY, {columns}) WITHOUT ROWID")
+    conn.commit()
+
+    if is_new and seed_csv and os.path.exists(seed_csv):
+        seeded = upsert_days(conn, pd.read_csv(seed_csv))
+        print(f"🌱 Seeded {db_path} with {seeded} days from {seed_csv}")
+    return conn
+
+
+def upsert_days(conn, df):
+    # Insert new dates, overwrite existing ones: fetching the same day twice is a no-op
+    if df.empty:
+        return 0
+    rows = df[["date"] + VALUE_COLUMNS].copy()
+    rows["date"] = pd.to_datetime(rows["date"]).dt.strftime("%Y-%m-%d")
+    rows = rows.astype(object).where(rows.notna(), None)
+
+    updates = ", ".join(f'"{col}" = excluded."{col}"' for col in VALUE_COLUMNS)
+    placeholders = ", ".join(["?"] * (len(VALUE_COLUMNS) + 1))
+    with conn:
+        conn.executemany(
+            f"INSERT INTO {TABLE} (date, {_COLUMNS_SQL}) VALUES ({placeholders}) "
+            f"ON CONFLICT(date) DO UPDATE SET {updates}",
+            rows.itertuples(index=False, name=None),
+        )
+    return len(rows)
+
+
+def has_date(conn, day):
+    return conn.execute(f"SELECT 1 FROM {TABLE} WHERE date = ?", (str(day),)).fetchone() is not None
+
+
+def existing_dates(conn):
+    return [row[0] for row in conn.execute(f"SELECT date FROM {TABLE} ORDER BY date")]
+
+
+def count_days(conn, end=None):
+    end = str(end) if end is not None else None
+    return conn.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE (? IS NULL OR date <= ?)", (end, end)).fetchone()[0]
+
+
+def fingerprint(conn, end=None):
+    # Content hash of every row up to end (inclusive): changes when any stored value does,
+    # not only when days are added or removed
+    end = str(end) if end is not None else None
+    h = hashlib.sha256()
+    for row in conn.execute(f"SELECT date, {_COLUMNS_SQL} FROM {TABLE} WHERE (? IS NULL OR date <= ?) ORDER BY date",
+                            (end, end)):
+        h.update(repr(row).encode())
+    return h.hexdigest()[:16]
+
+
+def missing_dates(conn, start, end):
+    # Calendar days in [start, end] that have no row in the store
+    known = {row[0] for row in conn.execute(
+        f"SELECT date FROM {TABLE} WHERE date BETWEEN ? AND ?", (str(start), str(end))
+    )}
+    return [day for day in pd.date_range(start, end).strftime("%Y-%m-%d") if day not in known]
+
+
+def read_range(conn, start=None, end=None):
+    # Rows in [start, end] (inclusive, either side optional) in the legacy CSV layout,
+    # with Next_Day_AQI taken from the following stored row
+    query = (
+        f"SELECT * FROM (SELECT date, {_COLUMNS_SQL}, "
+        f'LEAD("AQI") OVER (ORDER BY date) AS Next_Day_AQI FROM {TABLE}) '
+        "WHERE (? IS NULL OR date >= ?) AND (? IS NULL OR date <= ?) ORDER BY date"
+    )
+    start = str(start) if start is not None else None
+    end = str(end) if end is not None else None
+    return pd.read_sql_query(query, conn, params=(start, start, end, end))
+
+
+def export_csv(conn, csv_path=SEED_CSV_PATH):
+    read_range(conn).to_csv(csv_path, index=False)
+    print(f"✅ Exported daily store to {csv_path}")
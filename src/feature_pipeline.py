@@ -0,0 +1,100 @@
+import joblib
+import numpy as np
+
+PIPELINE_FILE = "feature_pipeline.pkl"
+SEQ_LEN = 7
+
+# Model inputs, in the order the LSTM sees them
+FEATURE_COLUMNS = [
+    'AQI', 'PM10', 'NO2', 'SO2', 'O3', 'Temperature', 'Humidity',
+    'Precipitation', 'month', 'log_PM2.5', 'log_CO', 'season_Spring',
+    'season_Summer', 'season_Winter', 'weekday_1', 'weekday_2', 'weekday_3',
+    'weekday_4', 'weekday_5', 'weekday_6', 'AQI_t+1', 'AQI_t+2', 'AQI_t+3',
+    'AQI_lag_1', 'AQI_lag_2', 'AQI_roll_mean_3', 'AQI_roll_std_3',
+    'AQI_diff'
+]
+TARGET_COLUMNS = ['AQI']
+
+# Future AQI columns built by preprocess_daily_data. They are the targets of the
+# direct multi-horizon head, so that head must not see them as inputs.
+HORIZON_COLUMNS = ['AQI_t+1', 'AQI_t+2', 'AQI_t+3']
+DIRECT_FEATURE_COLUMNS = [c for c in FEATURE_COLUMNS if c not in HORIZON_COLUMNS]
+
+# Models trained before the pipeline existed were fed the season_*/weekday_*
+# columns twice (37 inputs); their scalers are wrapped with this column order.
+LEGACY_FEATURE_COLUMNS = FEATURE_COLUMNS + [
+    'season_Spring', 'season_Summer', 'season_Winter',
+    'weekday_1', 'weekday_2', 'weekday_3', 'weekday_4', 'weekday_5', 'weekday_6'
+]
+
+
+# -----------------------------
+# Feature pipeline: column order + scaling, saved next to the model
+# -----------------------------
+class FeaturePipeline:
+    # Days predicted by one forward pass: 1 for the autoregressive head, 3 for the
+    # direct head (class default keeps pipelines pickled before this existed loadable)
+    horizon = 1
+
+    def __init__(self, feature_columns, scaler_X, scaler_y, target_columns=TARGET_COLUMNS,
+                 seq_len=SEQ_LEN, preprocess_state=None, horizon=1):
+        self.feature_columns = list(feature_columns)
+        self.target_columns = list(target_columns)
+        self.scaler_X = scaler_X
+        self.scaler_y = scaler_y
+        self.seq_len = seq_len
+        self.horizon = horizon
+        # IQR bounds / categories used by preprocess_daily_data when the model was trained
+        self.preprocess_state = preprocess_state
+
+    @classmethod
+    def fit(cls, df, feature_columns=FEATURE_COLUMNS, target_columns=TARGET_COLUMNS,
+            seq_len=SEQ_LEN, preprocess_state=None, horizon=1):
+        from sklearn.preprocessing import MinMaxScaler
+        scaler_X = MinMaxScaler().fit(df[list(feature_columns)].to_numpy(dtype=float))
+        scaler_y = MinMaxScaler().fit(df[list(target_columns)].to_numpy(dtype=float))
+        return cls(feature_columns, scaler_X, scaler_y, target_columns, seq_len, preprocess_state, horizon)
+
+    @classmethod
+    def from_legacy_scalers(cls, scaler_X, scaler_y):
+        return cls(LEGACY_FEATURE_COLUMNS, scaler_X, scaler_y)
+
+    @property
+    def n_features(self):
+        return len(self.feature_columns)
+
+    # MinMaxScaler.transform is X * scale_ + min_; doing it directly skips sklearn's
+    # input validation, which dominates the cost for a 7-row window.
+    # dtype=np.float32 keeps large (hourly) inputs at half the memory.
+    def transform(self, df, dtype=float):
+        X = df[self.feature_columns].to_numpy(dtype=dtype)
+        return X * self.scaler_X.scale_.astype(dtype) + self.scaler_X.min_.astype(dtype)
+
+    def transform_window(self, df):
+        # Scaled model input for the latest window only: shape (seq_len, n_features)
+        return self.transform(df.iloc[-self.seq_len:])
+
+    def transform_target(self, df, dtype=float):
+        y = df[self.target_columns].to_numpy(dtype=dtype)
+        return y * self.scaler_y.scale_.astype(dtype) + self.scaler_y.min_.astype(dtype)
+
+    def inverse_target(self, y_scaled):
+        # Works for (n, 1) and for (n, horizon) outputs of the direct head (one target column)
+        return (np.asarray(y_scaled, dtype=float) - self.scaler_y.min_) / self.scaler_y.scale_
+
+    def scale_feature(self, column, values):
+        # Scale raw values of one input column (e.g. a predicted AQI fed back as input)
+        idx = self.feature_columns.index(column)
+        return np.asarray(values, dtype=float) * self.scaler_X.scale_[idx] + self.scaler_X.min_[idx]
+
+    def prepare(self, raw_df):
+        # Raw daily rows -> engineered features with the state the model was trained on
+        from src.preprocess_daily_data import build_features, clean_raw
+        return build_features(clean_raw(raw_df, verbose=False), self.preprocess_state, verbose=False)
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
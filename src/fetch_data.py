@@ -2,97 +2,195 @@ import requests
 import pandas as pd
 from datetime import date, timedelta
 import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tqdm import tqdm
 
 LAT, LON = 24.8607, 67.0011
 TIMEZONE = "Asia/Karachi"
 
-def fetch_day_data(day):
-    # AQI and Pollutants
-    try:
-        air_url = (
-            "https://air-quality-api.open-meteo.com/v1/air-quality"
-            f"?latitude={LAT}&longitude={LON}"
-            f"&start_date={day}&end_date={day}"
-            "&hourly=us_aqi,pm2_5,pm10,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide,ozone"
-            f"&timezone={TIMEZONE}"
-        )
-        air_response = requests.get(air_url)
-        if air_response.status_code != 200 or air_response.text.strip() == "":
-            raise ValueError(f"Empty or failed air API response for {day}")
-
-        air_data = air_response.json()["hourly"]
-
-        # same for weather
-        weather_url = (
-            "https://archive-api.open-meteo.com/v1/archive"
-            f"?latitude={LAT}&longitude={LON}"
-            f"&start_date={day}&end_date={day}"
-            "&hourly=temperature_2m,relative_humidity_2m,precipitation"
-            f"&timezone={TIMEZONE}"
-        )
-        weather_response = requests.get(weather_url)
-        if weather_response.status_code != 200 or weather_response.text.strip() == "":
-            raise ValueError(f"Empty or failed weather API response for {day}")
-
-        weather_data = weather_response.json()["hourly"]
-
-        # continue normally...
-        df_air = pd.DataFrame(air_data)
-        df_weather = pd.DataFrame(weather_data)
-        df = pd.merge(df_air, df_weather, on='time')
-        df["time"] = pd.to_datetime(df["time"])
-        return df
-
-    except Exception as e:
-        print(f"Failed on {day}: {e}")
-        return None  # return None so you can skip that day
-
-def process_daily(day, df):
-    daily = df.set_index("time").resample("D").mean()
-    daily["date"] = day
-    daily = daily.rename(columns={
-        'us_aqi': 'AQI',
-        'pm2_5': 'PM2.5',
-        'pm10': 'PM10',
-        'nitrogen_dioxide': 'NO2',
-        'sulphur_dioxide': 'SO2',
-        'carbon_monoxide': 'CO',
-        'ozone': 'O3',
-        'temperature_2m': 'Temperature',
-        'relative_humidity_2m': 'Humidity',
-        'precipitation': 'Precipitation'
-    })
-    return daily[['date', 'AQI', 'PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3', 'Temperature', 'Humidity', 'Precipitation']]
-
-def main():
-    start = date(2023, 1, 1)
-    today = date.today()
-    all_days = []
-
-    for single in tqdm(pd.date_range(start, today), desc="Fetching days"):
-        day = single.date().isoformat()
-        
-        raw = fetch_day_data(day)  # internally handled
-
-        if raw is None or raw.empty:
-            continue  # Skip failed/empty day
-
-        try:
-            day_data = process_daily(day, raw)
-            if day_data is not None and not day_data.empty:
-                all_days.append(day_data)
-        except Exception as e:
-            print(f"Failed to process {day}: {e}")
-            continue
-
-    valid_days = [df for df in all_days if df is not None and not df.empty]
-
-    df_all = pd.concat(valid_days, ignore_index=True)
-    df_all = df_all.sort_values("date")
+AIR_QUALITY_URL = "https://air-quality-api.open-meteo.com/v1/air-quality"
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+AIR_VARIABLES = "us_aqi,pm2_5,pm10,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide,ozone"
+WEATHER_VARIABLES = "temperature_2m,relative_humidity_2m,precipitation"
+
+RENAME_MAP = {
+    'us_aqi': 'AQI',
+    'pm2_5': 'PM2.5',
+    'pm10': 'PM10',
+    'nitrogen_dioxide': 'NO2',
+    'sulphur_dioxide': 'SO2',
+    'carbon_monoxide': 'CO',
+    'ozone': 'O3',
+    'temperature_2m': 'Temperature',
+    'relative_humidity_2m': 'Humidity',
+    'precipitation': 'Precipitation'
+}
+VALUE_COLUMNS = ['AQI', 'PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3', 'Temperature', 'Humidity', 'Precipitation']
+EXTREMA_COLUMNS = ['AQI', 'PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3']
+ROLLING_8H_COLUMNS = ['O3', 'CO']  # US AQI uses 8-hour averages for these
+
+START_DATE = date(2023, 1, 1)
+DAILY_PATH = "data/karachi_daily_aqi_weather.csv"
+HOURLY_PATH = "data/karachi_hourly_aqi_weather.csv"
+
+# Backfill tuning
+CHUNK_FREQS = {"month": "MS", "quarter": "QS"}
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+TIMEOUT = 60
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+def make_session(pool_size=MAX_WORKERS, retries=MAX_RETRIES):
+    # Pooled keep-alive connections with exponential backoff on throttling / server errors
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_hourly(session, url, variables, start, end, lat=LAT, lon=LON, timezone=TIMEZONE):
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": str(start),
+        "end_date": str(end),
+        "hourly": variables,
+        "timezone": timezone,
+    }
+    response = session.get(url, params=params, timeout=TIMEOUT)
+    if response.status_code != 200 or response.text.strip() == "":
+        raise ValueError(f"Empty or failed API response for {start}..{end} from {url}")
+
+    payload = response.json()
+    if not payload.get("hourly"):
+        raise ValueError(f"Missing 'hourly' data for {start}..{end} from {url}")
+    return pd.DataFrame(payload["hourly"])
+
+
+def merge_hourly(air_frames, weather_frames):
+    df_air = pd.concat(air_frames, ignore_index=True)
+    df_weather = pd.concat(weather_frames, ignore_index=True)
+    df = pd.merge(df_air, df_weather, on="time").rename(columns=RENAME_MAP)
+    df["time"] = pd.to_datetime(df["time"])
+    df = df.drop_duplicates("time").sort_values("time").reset_index(drop=True)
+    return df[["time"] + VALUE_COLUMNS]
+
+
+def fetch_range(start, end, session=None, air_url=AIR_QUALITY_URL, weather_url=ARCHIVE_URL,
+                lat=LAT, lon=LON, timezone=TIMEZONE):
+    # One request per endpoint for the whole span; returns hourly rows with renamed columns
+    session = session or make_session()
+    air = fetch_hourly(session, air_url, AIR_VARIABLES, start, end, lat, lon, timezone)
+    weather = fetch_hourly(session, weather_url, WEATHER_VARIABLES, start, end, lat, lon, timezone)
+    return merge_hourly([air], [weather])
+
+
+# -----------------------------
+# Backfill
+# -----------------------------
+def date_chunks(start, end, chunk="month"):
+    # [start, end] split on calendar month/quarter boundaries
+    bounds = list(pd.date_range(start, end, freq=CHUNK_FREQS[chunk]).date)
+    starts = [pd.Timestamp(start).date()] + [b for b in bounds if b > pd.Timestamp(start).date()]
+    ends = [s - timedelta(days=1) for s in starts[1:]] + [pd.Timestamp(end).date()]
+    return list(zip(starts, ends))
+
+
+def backfill(start=START_DATE, end=None, chunk="month", max_workers=MAX_WORKERS,
+             session=None, air_url=AIR_QUALITY_URL, weather_url=ARCHIVE_URL,
+             lat=LAT, lon=LON, timezone=TIMEZONE):
+    end = end or date.today()
+    chunks = date_chunks(start, end, chunk)
+    session = session or make_session(pool_size=max_workers)
+
+    air_parts, weather_parts = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for chunk_start, chunk_end in chunks:
+            futures[pool.submit(fetch_hourly, session, air_url, AIR_VARIABLES, chunk_start, chunk_end,
+                                lat, lon, timezone)] = ("air", chunk_start)
+            futures[pool.submit(fetch_hourly, session, weather_url, WEATHER_VARIABLES, chunk_start, chunk_end,
+                                lat, lon, timezone)] = ("weather", chunk_start)
+
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching chunks"):
+            kind, chunk_start = futures[future]
+            try:
+                (air_parts if kind == "air" else weather_parts)[chunk_start] = future.result()
+            except Exception as e:
+                print(f"Failed on {kind} chunk starting {chunk_start}: {e}")
+
+    # Keep only chunks where both endpoints succeeded
+    ok = sorted(set(air_parts) & set(weather_parts))
+    if not ok:
+        raise RuntimeError("No chunk could be fetched from the API")
+    return merge_hourly([air_parts[k] for k in ok], [weather_parts[k] for k in ok])
+
+
+# -----------------------------
+# Hourly -> daily aggregation
+# -----------------------------
+def aggregate_daily(hourly, extra_stats=False):
+    # All days in one grouped pass over the hourly frame (same layout as HOURLY_PATH).
+    # extra_stats adds daily max/min and the max 8-hour rolling mean of O3/CO.
+    hourly = hourly.sort_values("time")
+    frame = hourly.set_index("time")[VALUE_COLUMNS]
+    aggs = {col: (col, "mean") for col in VALUE_COLUMNS}
+
+    if extra_stats:
+        rolling = frame[ROLLING_8H_COLUMNS].rolling("8h", min_periods=6).mean()
+        frame = frame.join(rolling.add_suffix("_8h"))
+        for col in EXTREMA_COLUMNS:
+            aggs[f"{col}_max"] = (col, "max")
+            aggs[f"{col}_min"] = (col, "min")
+        for col in ROLLING_8H_COLUMNS:
+            aggs[f"{col}_8h_max"] = (f"{col}_8h", "max")
+
+    daily = frame.groupby(frame.index.normalize()).agg(**aggs)
+    daily = daily.dropna(subset=VALUE_COLUMNS, how="all")
+    daily.insert(0, "date", daily.index.strftime("%Y-%m-%d"))
+    return daily.reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the Karachi AQI & weather history from Open-Meteo.")
+    parser.add_argument("--start", default=START_DATE.isoformat())
+    parser.add_argument("--end", default=date.today().isoformat())
+    parser.add_argument("--chunk", choices=sorted(CHUNK_FREQS), default="month")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--extra-stats", action="store_true", help="add daily max/min and 8-hour O3/CO maxima")
+    args = parser.parse_args(argv)
+
+    hourly = backfill(args.start, args.end, chunk=args.chunk, max_workers=args.workers)
+    hourly.to_csv(HOURLY_PATH, index=False)
+    print(f"✅ Hourly data saved to {HOURLY_PATH}")
+
+    df_all = aggregate_daily(hourly, extra_stats=args.extra_stats)
     df_all["Next_Day_AQI"] = df_all["AQI"].shift(-1)
-    df_all.to_csv("data/karachi_daily_aqi_weather.csv", index=False)
-    print("✅ Data saved to data/karachi_daily_aqi_weather.csv")
+    df_all.to_csv(DAILY_PATH, index=False)
+    print(f"✅ Data saved to {DAILY_PATH}")
+
+    # The daily store is what preprocessing reads; it only seeds itself from the CSV when
+    # the .db is new, so the rebuilt days are upserted into it here
+    from src import data_store  # data_store imports this module
+    conn = data_store.connect()
+    try:
+        upserted = data_store.upsert_days(conn, df_all)
+    finally:
+        conn.close()
+    print(f"✅ Upserted {upserted} days into {data_store.DB_PATH}")
 
 
 if __name__ == "__main__":
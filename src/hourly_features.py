@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pandas as pd
+from src.fetch_data import HOURLY_PATH, VALUE_COLUMNS
+from src.preprocess_daily_data import LOG_COLUMNS, IQR_COLUMNS, get_season, iqr_bounds, read_tail
+
+# -----------------------------
+# Hourly model: 3 days of hours in, the next 72 hours out
+# -----------------------------
+HOURLY_MODEL_DIR = os.path.join("lstm_model", "hourly")
+HOURLY_SEQ_LEN = 72
+HOURLY_HORIZON = 72
+CONTEXT_HOURS = 24  # history needed before the first window row (24-hour lag / rolling mean)
+
+HOURLY_FEATURE_COLUMNS = [
+    'AQI', 'PM10', 'NO2', 'SO2', 'O3', 'Temperature', 'Humidity', 'Precipitation',
+    'log_PM2.5', 'log_CO', 'hour_sin', 'hour_cos', 'weekday', 'month',
+    'season_Spring', 'season_Summer', 'season_Winter',
+    'AQI_lag_1', 'AQI_lag_24', 'AQI_roll_mean_24', 'AQI_diff'
+]
+
+
+# -----------------------------
+# Raw hourly rows (no daily aggregation)
+# -----------------------------
+def load_hourly(path=HOURLY_PATH, n_rows=None):
+    # float32 values; n_rows: only the latest rows, read from the end of the file
+    df = read_tail(path, n_rows)[0] if n_rows else pd.read_csv(path)
+    df["time"] = pd.to_datetime(df["time"])
+    df[VALUE_COLUMNS] = df[VALUE_COLUMNS].astype(np.float32)
+    return df
+
+
+def regularize(df):
+    # One row per hour: duplicated hours dropped, missing hours inserted, gaps filled,
+    # so that lag k is always k hours back
+    df = df.drop_duplicates("time", keep="last").set_index("time").sort_index()
+    df = df.reindex(pd.date_range(df.index[0], df.index[-1], freq="h"))
+    df = df.ffill().bfill()
+    df.index.name = "time"
+    return df.reset_index()
+
+
+# -----------------------------
+# Fitted state + features (same steps for training and forecasting)
+# -----------------------------
+def fit_hourly_state(df):
+    return {
+        "iqr_bounds": {col: iqr_bounds(df[col]) for col in IQR_COLUMNS},
+        "season_categories": ["Fall", "Spring", "Summer", "Winter"],
+    }
+
+
+def build_hourly_features(df, state):
+    # df: raw hourly rows (HOURLY_PATH layout). The first CONTEXT_HOURS rows only
+    # provide lag history and are dropped.
+    df = regularize(df)
+    hours = df["time"].dt.hour.to_numpy()
+    months = df["time"].dt.month
+
+    for col in LOG_COLUMNS:
+        df[f"log_{col}"] = np.log1p(df[col])
+    for col, (lower, upper) in state["iqr_bounds"].items():
+        df[col] = df[col].clip(lower, upper)
+
+    df["hour_sin"] = np.sin(2 * np.pi * hours / 24)
+    df["hour_cos"] = np.cos(2 * np.pi * hours / 24)
+    df["weekday"] = df["time"].dt.weekday
+    df["month"] = months
+    seasons = months.map(get_season)
+    for season in state["season_categories"][1:]:
+        df[f"season_{season}"] = (seasons == season).astype(np.float32)
+
+    aqi = df["AQI"]
+    df["AQI_lag_1"] = aqi.shift(1)
+    df["AQI_lag_24"] = aqi.shift(24)
+    df["AQI_roll_mean_24"] = aqi.shift(1).rolling(24).mean()
+    df["AQI_diff"] = aqi.diff().shift(1)
+
+    df = df.iloc[CONTEXT_HOURS:].reset_index(drop=True)
+    df[HOURLY_FEATURE_COLUMNS] = df[HOURLY_FEATURE_COLUMNS].astype(np.float32)
+    return df
@@ -0,0 +1,198 @@
+import os
+import json
+import pandas as pd
+import joblib
+import argparse
+import numpy as np
+from datetime import datetime
+from tensorflow.keras.callbacks import EarlyStopping
+from src.fetch_data import HOURLY_PATH
+from src.feature_pipeline import FeaturePipeline
+from src.hourly_features import (HOURLY_MODEL_DIR, HOURLY_FEATURE_COLUMNS, HOURLY_SEQ_LEN, HOURLY_HORIZON,
+                                 load_hourly, fit_hourly_state, build_hourly_features)
+from src.windowing import window_batches, window_dataset
+from src.numpy_lstm import export_weights
+from src.model_registry import artifact_paths, get_artifacts, predict_batch
+from src.lstm_model_training import build_model
+from src.backtest import _errors
+from src.preprocess_daily_data import read_tail
+
+# -------------------------
+# Configs & Paths
+# -------------------------
+LOG_PATH = os.path.join(HOURLY_MODEL_DIR, "update_log.txt")
+
+TEST_HOURS = 30 * 24  # last 30 days of forecast origins are held out
+VAL_FRACTION = 0.1
+BATCH_SIZE = 64
+MAX_EPOCHS = 30
+PATIENCE = 4
+UNITS = (64, 32)
+EVAL_BATCH_SIZE = 1024
+# The hourly file grows every pipeline run; a retrain (~2 min on one core) only happens
+# once this many hours have arrived since the data the current model was trained on
+RETRAIN_MIN_HOURS = 7 * 24
+
+
+# ----------------------
+# Windows over the float32 arrays, one batch at a time
+# ----------------------
+def window_rows(first, last, seq_len=HOURLY_SEQ_LEN, horizon=HOURLY_HORIZON):
+    # Rows needed for windows first .. last-1 (window i starts at row i)
+    return slice(first, last + seq_len + horizon - 1)
+
+
+def split_points(n_rows, seq_len=HOURLY_SEQ_LEN, horizon=HOURLY_HORIZON, test_hours=TEST_HOURS):
+    # -> (val_start, test_start, n_windows) in window indices
+    n_windows = n_rows - seq_len - horizon + 1
+    test_start = n_windows - test_hours
+    val_start = int(test_start * (1 - VAL_FRACTION))
+    return val_start, test_start, n_windows
+
+
+def predict_windows(model, pipeline, X, y, batch_size=EVAL_BATCH_SIZE):
+    # -> (actual, predicted) in AQI, shape (n_windows, horizon); windows are materialized
+    # one batch at a time
+    actual, predicted = [], []
+    for X_batch, y_batch in window_batches(X, y, pipeline.seq_len, batch_size, pipeline.horizon):
+        predicted.append(pipeline.inverse_target(predict_batch(model, X_batch)))
+        actual.append(pipeline.inverse_target(y_batch))
+    return np.concatenate(actual), np.concatenate(predicted)
+
+
+def evaluate(model, pipeline, X, y):
+    actual, predicted = predict_windows(model, pipeline, X, y)
+    # Hours ahead grouped by forecast day: 1-24h, 25-48h, 49-72h
+    by_day = {f"day {d + 1}": _errors(actual[:, d * 24:(d + 1) * 24], predicted[:, d * 24:(d + 1) * 24])
+              for d in range(pipeline.horizon // 24)}
+    return {"overall": _errors(actual, predicted), "by_day": by_day, "origins": len(actual)}
+
+
+def retrain_due(data_path=HOURLY_PATH, model_dir=HOURLY_MODEL_DIR, min_hours=RETRAIN_MIN_HOURS):
+    # -> (due?, reason); reads metrics.json and the last line of the hourly file only
+    metrics_path = os.path.join(model_dir, "metrics.json")
+    if not os.path.exists(artifact_paths(model_dir)["model"]) or not os.path.exists(metrics_path):
+        return True, "no hourly model yet"
+    with open(metrics_path, "r") as f:
+        data_end = json.load(f).get("data_end")
+    if data_end is None:
+        return True, "model has no recorded data_end"
+    last_time = pd.Timestamp(read_tail(data_path, 1)[0]["time"].iloc[-1])
+    new_hours = int((last_time - pd.Timestamp(data_end)) / pd.Timedelta(hours=1))
+    if new_hours >= min_hours:
+        return True, f"{new_hours} new hours since {data_end}"
+    return False, f"only {new_hours} new hours since {data_end} (retrains at {min_hours})"
+
+
+# ----------------------
+# Save & Log
+# ----------------------
+def save_artifacts(model, pipeline, metrics, model_dir=HOURLY_MODEL_DIR):
+    os.makedirs(model_dir, exist_ok=True)
+    paths = artifact_paths(model_dir)
+    model.save(paths["model"])
+    export_weights(model, paths["weights"], paths["model"])
+    pipeline.save(paths["pipeline"])
+    joblib.dump(pipeline.scaler_X, paths["scaler_X"])
+    joblib.dump(pipeline.scaler_y, paths["scaler_y"])
+    with open(os.path.join(model_dir, "metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=2)
+
+
+def write_log(log_entry, log_path=LOG_PATH):
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "a") as log:
+        log.write(json.dumps(log_entry) + "\n")
+    print("\n🕒 Last Update Log:")
+    print(json.dumps(log_entry))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the hourly LSTM (72 hours in, next 72 hours out)")
+    parser.add_argument("--data", default=HOURLY_PATH)
+    parser.add_argument("--model-dir", default=HOURLY_MODEL_DIR)
+    parser.add_argument("--epochs", type=int, default=MAX_EPOCHS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-new-hours", type=int, default=RETRAIN_MIN_HOURS,
+                        help="skip training until this many hours arrived since the current model's data (0: always train)")
+    args = parser.parse_args(argv)
+
+    due, reason = retrain_due(args.data, args.model_dir, args.min_new_hours)
+    if not due:
+        print(f"⏭️ Hourly model kept: {reason}")
+        return
+    print(f"🛠️ Training hourly model: {reason}")
+
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(args.seed)
+
+    # ----------------------
+    # Features + pipeline; everything stays float32 and un-windowed in memory
+    # ----------------------
+    raw = load_hourly(args.data)
+    state = fit_hourly_state(raw)
+    df = build_hourly_features(raw, state)
+    pipeline = FeaturePipeline.fit(df, feature_columns=HOURLY_FEATURE_COLUMNS, seq_len=HOURLY_SEQ_LEN,
+                                   preprocess_state=state, horizon=HOURLY_HORIZON)
+    X = pipeline.transform(df, dtype=np.float32)
+    y = pipeline.transform_target(df, dtype=np.float32)
+    val_start, test_start, n_windows = split_points(len(X))
+    print(f"📥 {len(df)} hours ({df['time'].iloc[0]} .. {df['time'].iloc[-1]}), {n_windows} windows, "
+          f"X {X.nbytes / 1e6:.1f} MB")
+
+    train_rows = window_rows(0, val_start)
+    val_rows = window_rows(val_start, test_start)
+    test_rows = window_rows(test_start, n_windows)
+
+    # ----------------------
+    # Train on streamed batches of windows
+    # ----------------------
+    train_ds = window_dataset(X[train_rows], y[train_rows], HOURLY_SEQ_LEN, BATCH_SIZE, HOURLY_HORIZON,
+                              shuffle=True, seed=args.seed)
+    val_ds = window_dataset(X[val_rows], y[val_rows], HOURLY_SEQ_LEN, EVAL_BATCH_SIZE, HOURLY_HORIZON)
+    model = build_model(HOURLY_SEQ_LEN, pipeline.n_features, HOURLY_HORIZON, UNITS)
+    es = EarlyStopping(patience=PATIENCE, restore_best_weights=True)
+    history = model.fit(train_ds, validation_data=val_ds, epochs=args.epochs, callbacks=[es],
+                        shuffle=False, verbose=2)  # window order is shuffled by window_dataset
+
+    # ----------------------
+    # Evaluate on the held-out origins, and the current model on the same ones
+    # ----------------------
+    result = evaluate(model, pipeline, X[test_rows], y[test_rows])
+    print(f"\n📊 Test ({result['origins']} origins): MAE {result['overall']['MAE']:.2f}, RMSE {result['overall']['RMSE']:.2f}")
+    for name, errs in result["by_day"].items():
+        print(f"   {name}: MAE {errs['MAE']:.2f}, RMSE {errs['RMSE']:.2f}")
+
+    current_rmse = None
+    if os.path.exists(artifact_paths(args.model_dir)["model"]):
+        current = get_artifacts(args.model_dir)
+        current_pipeline = current["pipeline"]
+        current_df = build_hourly_features(raw, current_pipeline.preprocess_state)
+        X_cur = current_pipeline.transform(current_df, dtype=np.float32)
+        y_cur = current_pipeline.transform_target(current_df, dtype=np.float32)
+        current_rmse = evaluate(current["model"], current_pipeline, X_cur[test_rows], y_cur[test_rows])["overall"]["RMSE"]
+        print(f"📏 Current model test RMSE: {current_rmse:.2f}")
+
+    new_rmse = result["overall"]["RMSE"]
+    update_model = current_rmse is None or new_rmse < current_rmse
+    if update_model:
+        metrics = dict(result, data_end=str(df["time"].iloc[-1]), epochs=len(history.history["loss"]))
+        save_artifacts(model, pipeline, metrics, args.model_dir)
+        print(f"💾 Hourly model saved to {args.model_dir}")
+    else:
+        print(f"❌ New model did NOT outperform the current one (RMSE {new_rmse:.2f} vs {current_rmse:.2f}). Not saving.")
+
+    write_log({
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "status": "UPDATED" if update_model else "NOT UPDATED",
+        "train_windows": val_start,
+        "test_windows": result["origins"],
+        "MAE": result["overall"]["MAE"],
+        "RMSE": new_rmse,
+        "current_RMSE": current_rmse,
+        "epochs": len(history.history["loss"]),
+    }, os.path.join(args.model_dir, "update_log.txt"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing as mp
+from datetime import datetime
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from src.windowing import make_windows
+
+# -------------------
+# Configs & Paths
+# -------------------
+LSTM_MODEL_DIR = "lstm_model"
+LEADERBOARD_PATH = os.path.join(LSTM_MODEL_DIR, "leaderboard.json")
+
+SEARCH_SPACE = {
+    "units": [32, 64, 128],        # units of the first LSTM layer
+    "layers": [1, 2],              # each extra layer has half the units of the previous one
+    "seq_len": [7, 14],
+    "dropout": [0.0, 0.2],
+    "batch_size": [16, 32, 64],
+    "learning_rate": [1e-3, 3e-4],
+}
+N_RANDOM_TRIALS = 12
+MAX_EPOCHS = 100
+PATIENCE = 20
+VAL_FRACTION = 0.1
+THREADS_PER_WORKER = 1
+
+# Set in each worker by _init_worker: (SharedMemory, array view) per shared array + the pipeline
+_shared = {}
+
+
+# -------------------
+# Configurations
+# -------------------
+def grid(space=SEARCH_SPACE):
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*space.values())]
+
+
+def random_sample(n, space=SEARCH_SPACE, seed=0):
+    configs = grid(space)
+    return random.Random(seed).sample(configs, min(n, len(configs)))
+
+
+def layer_units(config):
+    return tuple(max(config["units"] // 2 ** i, 8) for i in range(config["layers"]))
+
+
+# -------------------
+# Shared memory: the scaled features/targets are prepared once in the parent
+# -------------------
+def share_arrays(arrays):
+    # {name: ndarray} -> ({name: SharedMemory}, {name: (shm name, shape, dtype)})
+    blocks, specs = {}, {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+        blocks[name] = shm
+        specs[name] = (shm.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _init_worker(specs, threads, pipeline):
+    # Limit TensorFlow to `threads` cores before it runs any op, so N workers
+    # share the machine instead of each spawning a thread per core
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _shared[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    _shared["pipeline"] = pipeline  # small, pickled once per worker
+
+
+# -------------------
+# One trial (runs in a worker process)
+# -------------------
+def run_trial(trial_id, config, horizon, test_days, max_epochs, patience, seed):
+    import tensorflow as tf
+    from tensorflow.keras.callbacks import EarlyStopping
+    from src.lstm_model_training import build_model, evaluate
+
+    start = time.perf_counter()
+    tf.keras.utils.set_random_seed(seed + trial_id)
+    X_all, y_all = _shared["X"][1], _shared["y"][1]
+    pipeline = _shared["pipeline"]
+
+    # Strided views over shared memory: no per-trial copy of the data
+    X_seq, y_seq = make_windows(X_all, config["seq_len"], y_all, horizon)
+    # Same test days for every seq_len: the last test_days windows end on the same dates
+    split_idx = len(X_seq) - test_days
+    val_idx = int(split_idx * (1 - VAL_FRACTION))
+    X_train, y_train = X_seq[:val_idx], y_seq[:val_idx]
+    X_val, y_val = X_seq[val_idx:split_idx], y_seq[val_idx:split_idx]
+    X_test, y_test = X_seq[split_idx:], y_seq[split_idx:]
+
+    model = build_model(config["seq_len"], X_all.shape[1], horizon, layer_units(config),
+                        config["dropout"], config["learning_rate"])
+    es = EarlyStopping(patience=patience, restore_best_weights=True)
+    history = model.fit(X_train, y_train, epochs=max_epochs, batch_size=config["batch_size"],
+                        validation_data=(X_val, y_val), callbacks=[es], verbose=0)
+
+    # Ranked on validation; test metrics are reported but not used for selection
+    val_mae, val_rmse, _, _ = evaluate(model, pipeline, X_val, y_val)
+    mae, rmse, r2, _ = evaluate(model, pipeline, X_test, y_test)
+    return {
+        "trial": trial_id,
+        "config": dict(config, units_per_layer=list(layer_units(config))),
+        "val_MAE": round(float(val_mae), 2),
+        "val_RMSE": round(float(val_rmse), 2),
+        "MAE": round(float(mae), 2),
+        "RMSE": round(float(rmse), 2),
+        "R2": round(float(r2), 4),
+        "epochs": len(history.history["loss"]),
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+
+
+# -------------------
+# Search
+# -------------------
+def search(configs, head="single", workers=None, threads=THREADS_PER_WORKER, max_epochs=MAX_EPOCHS,
+           patience=PATIENCE, seed=0):
+    from src.lstm_model_training import TEST_DAYS, fit_pipeline, load_training_data
+
+    df = load_training_data()
+    pipeline = fit_pipeline(df, head)
+    arrays = {
+        "X": pipeline.transform(df).astype(np.float32),
+        "y": pipeline.transform_target(df).astype(np.float32),
+    }
+    blocks, specs = share_arrays(arrays)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    print(f"🔎 {len(configs)} trials on {workers} worker(s) x {threads} thread(s)")
+
+    results = []
+    try:
+        # spawn: TensorFlow is not fork-safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(specs, threads, pipeline)) as pool:
+            futures = [pool.submit(run_trial, i, config, pipeline.horizon, TEST_DAYS, max_epochs, patience, seed)
+                       for i, config in enumerate(configs)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"✅ Trial {result['trial']}: val RMSE {result['val_RMSE']:.2f}, "
+                      f"test RMSE {result['RMSE']:.2f} ({result['epochs']} epochs, {result['seconds']}s) "
+                      f"{result['config']}")
+    finally:
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    results.sort(key=lambda r: r["val_RMSE"])
+    return results
+
+
+def write_leaderboard(results, head, leaderboard_path=LEADERBOARD_PATH):
+    os.makedirs(os.path.dirname(leaderboard_path) or ".", exist_ok=True)
+    leaderboard = {
+        "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "head": head,
+        "ranked_by": "val_RMSE",
+        "trials": results,
+    }
+    with open(leaderboard_path, "w") as f:
+        json.dump(leaderboard, f, indent=2)
+    print(f"💾 Leaderboard saved to {leaderboard_path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter / architecture search for the LSTM")
+    parser.add_argument("--grid", action="store_true", help="full grid instead of a random sample")
+    parser.add_argument("--trials", type=int, default=N_RANDOM_TRIALS)
+    parser.add_argument("--head", choices=["single", "multi"], default="single")
+    parser.add_argument("--workers", type=int, default=None, help="default: CPU cores / threads")
+    parser.add_argument("--threads", type=int, default=THREADS_PER_WORKER, help="TensorFlow threads per worker")
+    parser.add_argument("--epochs", type=int, default=MAX_EPOCHS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    configs = grid() if args.grid else random_sample(args.trials, seed=args.seed)
+    results = search(configs, args.head, args.workers, args.threads, args.epochs, seed=args.seed)
+    write_leaderboard(results, args.head)
+
+    best = results[0]
+    print(f"\n🏆 Best: {best['config']} (val RMSE {best['val_RMSE']:.2f}, test RMSE {best['RMSE']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
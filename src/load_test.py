@@ -0,0 +1,128 @@
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+from urllib.parse import urlsplit
+from src.serve import HOST, PORT
+
+# -------------------
+# Configs
+# -------------------
+REQUESTS = 5000
+CONCURRENCY = 32
+PATHS = ["/current", "/forecast", "/history", "/explanation", "/health"]
+STARTUP_TIMEOUT = 120  # seconds to wait for --serve to accept connections (after its warm-up)
+
+
+# -------------------
+# Keep-alive HTTP/1.1 clients on raw asyncio sockets (the client must stay much
+# cheaper than the server, both share the CPU when testing locally)
+# -------------------
+async def get(reader, writer, host, path):
+    # -> status code; reads the whole body
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, paths, n_requests, offset, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(n_requests):
+            path = paths[(offset + i) % len(paths)]
+            start = time.perf_counter()
+            status = await get(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, paths, n_requests, concurrency):
+    # Warm-up: one request per path, so cache misses (model, LIME) are not timed
+    reader, writer = await asyncio.open_connection(host, port)
+    for path in paths:
+        status = await get(reader, writer, host, path)
+        if status != 200:
+            print(f"⚠️ Warm-up {path}: HTTP {status}")
+    writer.close()
+
+    latencies, statuses = [], {}
+    per_client = [n_requests // concurrency + (i < n_requests % concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, paths, n, i, latencies, statuses)
+                           for i, n in enumerate(per_client) if n])
+    seconds = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": round(seconds, 2),
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "statuses": statuses,
+    }
+
+
+# -------------------
+# Optional local server (python -m src.serve in a subprocess)
+# -------------------
+def start_server(host, port):
+    proc = subprocess.Popen([sys.executable, "-m", "src.serve", "--host", host, "--port", str(port)])
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"src.serve exited with code {proc.returncode}")
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise TimeoutError(f"src.serve did not start within {STARTUP_TIMEOUT}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the HTTP forecast service (src/serve.py)")
+    parser.add_argument("--url", default=f"http://{HOST}:{PORT}")
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="keep-alive connections")
+    parser.add_argument("--paths", nargs="+", default=PATHS, help="requested round-robin")
+    parser.add_argument("--serve", action="store_true", help="start python -m src.serve for the test")
+    args = parser.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    proc = start_server(host, port) if args.serve else None
+    try:
+        result = asyncio.run(run_load(host, port, args.paths, args.requests, args.concurrency))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print(f"\n🚦 {result['requests']} requests, {result['concurrency']} connections, {result['seconds']}s")
+    print(f"   {result['requests_per_second']} req/s, latency p50 {result['p50_ms']} ms, "
+          f"p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms")
+    print(f"   status codes: {result['statuses']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import os
+import json
+
+# -------------------
+# Configs & Paths
+# -------------------
+# Light on purpose (json + os only): app.py imports it at startup
+LOCATIONS_PATH = "locations.json"
+LOCATIONS_DIR = "locations"
+DEFAULT_LOCATION = {"id": "karachi", "name": "Karachi", "lat": 24.8607, "lon": 67.0011}
+DEFAULT_TIMEZONE = "Asia/Karachi"
+
+
+# -------------------
+# Locations: each one has the same file layout (data/, processed_data/, lstm_model/,
+# predictions/, lime_explanations/) under its own root. The default location's root is
+# the repository itself, so its artifacts keep their original paths.
+# -------------------
+def load_locations(path=LOCATIONS_PATH):
+    # -> {id: {"id", "name", "lat", "lon", "timezone", "root"}}, default location first
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            config = json.load(f)
+    else:
+        config = {"default": DEFAULT_LOCATION["id"], "locations": [DEFAULT_LOCATION]}
+
+    locations = {}
+    for entry in sorted(config["locations"], key=lambda e: e["id"] != config["default"]):
+        root = "." if entry["id"] == config["default"] else os.path.join(LOCATIONS_DIR, entry["id"])
+        locations[entry["id"]] = dict({"timezone": DEFAULT_TIMEZONE, "root": root}, **entry)
+    if config["default"] not in locations:
+        raise ValueError(f"Default location {config['default']!r} is not listed in {path}")
+    return locations
+
+
+def location_path(root, path):
+    # normpath keeps the default location's paths identical to the legacy ones
+    # ("./lstm_model" -> "lstm_model"), so they share the registry's cache entries
+    return os.path.normpath(os.path.join(root, path))
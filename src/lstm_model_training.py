@@ -3,152 +3,435 @@ import pandas as pd
 import numpy as np
 import joblib
 import json
-import matplotlib.pyplot as plt
+import argparse
 from datetime import datetime
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Dropout
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
 from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.optimizers import Adam
+from src.feature_pipeline import (FeaturePipeline, PIPELINE_FILE, SEQ_LEN, FEATURE_COLUMNS,
+                                  DIRECT_FEATURE_COLUMNS, HORIZON_COLUMNS)
+from src.preprocess_daily_data import load_state
+from src.windowing import make_windows
+from src.numpy_lstm import WEIGHTS_FILE, export_weights
+from src.model_registry import get_artifacts
+from src.backtest import HORIZON, backtest, print_report
+from src.hyperparam_search import LEADERBOARD_PATH
 
 # -------------------------
 # Configs & Paths
 # -------------------------
 LSTM_MODEL_DIR = "lstm_model"
-os.makedirs(LSTM_MODEL_DIR, exist_ok=True)
-
+DATA_PATH = "processed_data/daily_karachi_preprocessed.csv"
 
 MODEL_PATH = os.path.join(LSTM_MODEL_DIR, "lstm_aqi_model.keras")
 SCALER_X_PATH = os.path.join(LSTM_MODEL_DIR, "scaler_X.pkl")
 SCALER_Y_PATH = os.path.join(LSTM_MODEL_DIR, "scaler_y.pkl")
+PIPELINE_PATH = os.path.join(LSTM_MODEL_DIR, PIPELINE_FILE)
+WEIGHTS_PATH = os.path.join(LSTM_MODEL_DIR, WEIGHTS_FILE)
 METRICS_PATH = os.path.join(LSTM_MODEL_DIR, "metrics.json")
 LOG_PATH = os.path.join(LSTM_MODEL_DIR, "update_log.txt")
+TRAINING_STATE_PATH = os.path.join(LSTM_MODEL_DIR, "training_state.json")
+
+# Promotion gate: the last TEST_DAYS forecast origins (a year, every season), held out
+# of the candidate's training and backtested for both candidate and current model
+TEST_DAYS = 365
+
+# Fine-tune mode: a few epochs from the current weights on the most recent
+# training windows, instead of 100 epochs from scratch on the full history
+FINETUNE_DAYS = 180
+FINETUNE_EPOCHS = 5
+FINETUNE_LR = 1e-4
+# auto mode falls back to a full retrain every FULL_RETRAIN_DAYS, or when the
+# current model's backtest RMSE (a real RMSE, src/backtest.py) has grown DRIFT_FACTOR
+# times its reference value
+FULL_RETRAIN_DAYS = 7
+DRIFT_FACTOR = 1.5
+MODES = ["auto", "finetune", "full"]
+# metrics.json format: 2 stores a real RMSE under "RMSE"; unversioned files stored the MSE
+METRICS_VERSION = 2
+
+# single: predicts t+1, predict.py rolls it forward 3 times
+# multi:  predicts t+1..t+3 in one pass, trained on AQI_t+1..AQI_t+3 and
+#         without those columns as inputs
+HEADS = ["single", "multi"]
+
+# Full-retrain architecture and training settings, in the leaderboard's config keys
+# (src/hyperparam_search.py); overridden by --config-from-leaderboard and the flags below
+DEFAULT_CONFIG = {
+    "units_per_layer": [64, 32],
+    "seq_len": SEQ_LEN,
+    "dropout": 0.2,
+    "learning_rate": 1e-3,
+    "batch_size": 32,
+}
 
 # ----------------------
 # Load and Prepare Data
 # ----------------------
-df = pd.read_csv("processed_data/daily_karachi_preprocessed.csv")
-df["ds"] = pd.to_datetime(df["date"])
-df["y"] = df["AQI"]
-
-features = [
-     'AQI', 'PM10', 'NO2', 'SO2', 'O3', 'Temperature', 'Humidity',
-       'Precipitation', 'month', 'log_PM2.5', 'log_CO', 'season_Spring',
-       'season_Summer', 'season_Winter', 'weekday_1', 'weekday_2', 'weekday_3',
-       'weekday_4', 'weekday_5', 'weekday_6', 'AQI_t+1', 'AQI_t+2', 'AQI_t+3',
-       'AQI_lag_1', 'AQI_lag_2', 'AQI_roll_mean_3', 'AQI_roll_std_3',
-       'AQI_diff'] + [col for col in df.columns if col.startswith("season_") or col.startswith("weekday_")]
+def load_training_data(data_path=DATA_PATH):
+    df = pd.read_csv(data_path)
+    df["ds"] = pd.to_datetime(df["date"])
+    df["y"] = df["AQI"]
+    return df
 
 # ----------------------
-# Scale the Data
+# Create Sequences
 # ----------------------
-scaler_X = MinMaxScaler()
-scaler_y = MinMaxScaler()
-
-X_all = scaler_X.fit_transform(df[features])
-y_all = scaler_y.fit_transform(df[["y"]])
+def create_sequences(X, y, seq_length=7, horizon=1):
+    # Zero-copy strided windows, see src/windowing.py
+    return make_windows(X, seq_length, y, horizon)
 
 # ----------------------
-# Create Sequences
+# Build Model
 # ----------------------
-def create_sequences(X, y, seq_length=7):
-    X_seq, y_seq = [], []
-    for i in range(len(X) - seq_length):
-        X_seq.append(X[i:i+seq_length])
-        y_seq.append(y[i+seq_length])
-    return np.array(X_seq), np.array(y_seq)
+def build_model(seq_len, n_features, n_outputs=1, units=(64, 32), dropout=0.2, learning_rate=None):
+    # Stacked LSTM: one layer per entry of units, each followed by Dropout
+    layers = [Input(shape=(seq_len, n_features))]
+    for i, n_units in enumerate(units):
+        layers.append(LSTM(n_units, return_sequences=i < len(units) - 1))
+        layers.append(Dropout(dropout))
+    layers.append(Dense(n_outputs))
 
-SEQ_LEN = 7
-X_seq, y_seq = create_sequences(X_all, y_all, SEQ_LEN)
-
-split_idx = len(X_seq) - 30
-X_train, X_test = X_seq[:split_idx], X_seq[split_idx:]
-y_train, y_test = y_seq[:split_idx], y_seq[split_idx:]
+    model = Sequential(layers)
+    optimizer = 'adam' if learning_rate is None else Adam(learning_rate=learning_rate)
+    model.compile(optimizer=optimizer, loss='mse')
+    return model
 
 # ----------------------
-# Build & Train New Model
+# Evaluate
 # ----------------------
-model = Sequential([
-    LSTM(64, return_sequences=True, input_shape=(SEQ_LEN, X_seq.shape[2])),
-    Dropout(0.2),
-    LSTM(32),
-    Dropout(0.2),
-    Dense(1)
-])
-
-model.compile(optimizer='adam', loss='mse')
-es = EarlyStopping(patience=20, restore_best_weights=True)
+def evaluate(model, pipeline, X_test, y_test):
+    # Metrics on t+1 (comparable across heads) plus the per-horizon RMSE
+    y_pred = pipeline.inverse_target(model.predict(X_test, verbose=0))
+    y_test_actual = pipeline.inverse_target(y_test)
 
-history = model.fit(X_train, y_train, epochs=100, batch_size=32,
-                    validation_split=0.1, callbacks=[es], verbose=0)
+    mae = mean_absolute_error(y_test_actual[:, 0], y_pred[:, 0])
+    rmse = np.sqrt(mean_squared_error(y_test_actual[:, 0], y_pred[:, 0]))
+    r2 = r2_score(y_test_actual[:, 0], y_pred[:, 0])
+    rmse_by_horizon = [float(np.sqrt(mean_squared_error(y_test_actual[:, k], y_pred[:, k])))
+                       for k in range(y_pred.shape[1])]
+    return mae, rmse, r2, rmse_by_horizon
 
 # ----------------------
-# Evaluate New Model
+# Save & Log
 # ----------------------
-y_pred_scaled = model.predict(X_test)
-y_pred = scaler_y.inverse_transform(y_pred_scaled)
-y_test_actual = scaler_y.inverse_transform(y_test)
+def save_artifacts(model, pipeline, metrics):
+    os.makedirs(LSTM_MODEL_DIR, exist_ok=True)
+    model.save(MODEL_PATH)
+    export_weights(model, WEIGHTS_PATH, MODEL_PATH)  # TensorFlow-free inference (src/numpy_lstm.py)
+    pipeline.save(PIPELINE_PATH)
+    joblib.dump(pipeline.scaler_X, SCALER_X_PATH)
+    joblib.dump(pipeline.scaler_y, SCALER_Y_PATH)
+    with open(METRICS_PATH, "w") as f:
+        json.dump(metrics, f, indent=2)
 
-mae = mean_absolute_error(y_test_actual, y_pred)
-rmse = mean_squared_error(y_test_actual, y_pred)
-r2 = r2_score(y_test_actual, y_pred)
 
-print("\n📊 Evaluation on Test Set:")
-print(f"MAE: {mae:.2f}, RMSE: {rmse:.2f}, R2: {r2:.4f}")
+def write_log(log_entry):
+    with open(LOG_PATH, "a") as log:
+        log.write(json.dumps(log_entry) + "\n")
 
-# ----------------------
-# Compare with Old Model (if exists)
-# ----------------------
-update_model = True
-if os.path.exists(METRICS_PATH):
+    # Show last update
+    with open(LOG_PATH, "r") as log:
+        lines = log.readlines()
+        print("\n🕒 Last Update Log:")
+        print(lines[-1].strip())
+
+
+def load_metrics():
+    if not os.path.exists(METRICS_PATH):
+        return None
     with open(METRICS_PATH, "r") as f:
-        old_metrics = json.load(f)
-    if rmse >= old_metrics['RMSE']:
-        update_model = False
-        print("❌ New model did NOT outperform the previous one. Not saving.")
-    else:
-        print("✅ New model is better. Saving.")
+        metrics = json.load(f)
+    if metrics.get("metrics_version") is None:
+        # Migrated once: the legacy "RMSE" was an MSE
+        metrics["RMSE"] = round(float(np.sqrt(metrics["RMSE"])), 2)
+        metrics["metrics_version"] = METRICS_VERSION
+        with open(METRICS_PATH, "w") as f:
+            json.dump(metrics, f, indent=2)
+        print(f"🔁 Migrated {METRICS_PATH} to metrics_version {METRICS_VERSION} (RMSE instead of MSE)")
+    return metrics
+
+
+def load_training_state():
+    # {"last_full_retrain": "YYYY-MM-DD", "reference_backtest_rmse": float}
+    if not os.path.exists(TRAINING_STATE_PATH):
+        return {}
+    with open(TRAINING_STATE_PATH, "r") as f:
+        return json.load(f)
+
+
+def save_training_state(state):
+    with open(TRAINING_STATE_PATH, "w") as f:
+        json.dump(state, f, indent=2)
+
 
 # ----------------------
-# Save Model if Better
+# Full retrain vs fine-tune
 # ----------------------
+def load_current(head):
+    # Current model + its feature pipeline, or None if it cannot be fine-tuned for this head
+    if not os.path.exists(MODEL_PATH):
+        return None
+    artifacts = get_artifacts(LSTM_MODEL_DIR, engine="keras")
+    pipeline = artifacts["pipeline"]
+    if (pipeline.horizon > 1) != (head == "multi"):
+        return None
+    return artifacts["model"], pipeline
 
-if update_model:
-    model.save(MODEL_PATH)
-    joblib.dump(scaler_X, SCALER_X_PATH)
-    joblib.dump(scaler_y, SCALER_Y_PATH)
 
+def choose_mode(requested, current, state, current_rmse, current_oos=True):
+    # -> (mode, reason)
+    if requested == "full":
+        return "full", "requested"
+    if current is None:
+        return "full", "no compatible model to fine-tune"
+    if not current_oos:
+        return "full", "current model was trained on the gate's days"
+    if requested == "finetune":
+        return "finetune", "requested"
+
+    last_full = state.get("last_full_retrain")
+    if last_full is None:
+        return "full", "no previous full retrain recorded"
+    days_since = (datetime.now() - datetime.strptime(last_full, "%Y-%m-%d")).days
+    if days_since >= FULL_RETRAIN_DAYS:
+        return "full", f"last full retrain {days_since} days ago"
+
+    # The key was renamed when the reference moved from evaluate()'s MSE to the backtest
+    # RMSE, so an older MSE-scale reference is never compared with an RMSE
+    reference = state.get("reference_backtest_rmse")
+    if reference and current_rmse > DRIFT_FACTOR * reference:
+        return "full", f"drift: backtest RMSE {current_rmse:.2f} vs reference {reference:.2f}"
+    return "finetune", f"last full retrain {days_since} days ago, no drift"
+
+
+def fit_pipeline(df, head, seq_len=SEQ_LEN):
+    if head == "multi":
+        # Targets come from AQI itself: window i -> AQI of the 3 days after it, i.e.
+        # AQI_t+1..AQI_t+3 of its last row. Windows stop where those days are known,
+        # so the forward-filled AQI_t+k of the last 3 rows are never trained on.
+        return FeaturePipeline.fit(df, feature_columns=DIRECT_FEATURE_COLUMNS, seq_len=seq_len,
+                                   preprocess_state=load_state(), horizon=len(HORIZON_COLUMNS))
+    return FeaturePipeline.fit(df, feature_columns=FEATURE_COLUMNS, seq_len=seq_len,
+                               preprocess_state=load_state())
+
+
+def leaderboard_config(head, leaderboard_path=LEADERBOARD_PATH):
+    # Config of the best trial of python -m src.hyperparam_search
+    with open(leaderboard_path, "r") as f:
+        leaderboard = json.load(f)
+    if leaderboard.get("head") != head:
+        print(f"⚠️ {leaderboard_path} was searched for the {leaderboard.get('head')} head, training the {head} head.")
+    best = leaderboard["trials"][0]
+    print(f"🏆 Using trial {best['trial']} of {leaderboard_path} (val RMSE {best['val_RMSE']:.2f})")
+    return {key: best["config"][key] for key in DEFAULT_CONFIG}
+
+
+def gate_start(df):
+    # Row of the gate's first origin: the last TEST_DAYS origins whose HORIZON days are
+    # known, as src/backtest.py selects them
+    return len(df) - HORIZON - TEST_DAYS
+
+
+def split_windows(df, pipeline):
+    # Training windows end HORIZON days before the first gate origin, so neither their
+    # targets nor the single head's AQI_t+k inputs reach a day the gate forecasts.
+    # Test windows start at that origin (t+1 metrics, scored on the same days as the gate).
+    X_seq, y_seq = create_sequences(pipeline.transform(df), pipeline.transform_target(df),
+                                    pipeline.seq_len, pipeline.horizon)
+    first_origin = gate_start(df)
+    train_end = first_origin - HORIZON - pipeline.seq_len + 2
+    test_start = first_origin - pipeline.seq_len + 1
+    return X_seq[:train_end], X_seq[test_start:], y_seq[:train_end], y_seq[test_start:]
+
+
+def out_of_sample(metrics, df):
+    # True if the saved model was trained only on days up to the gate's first origin,
+    # i.e. the gate is out of sample for it too (older models did not record this)
+    trained_through = (metrics or {}).get("trained_through")
+    return trained_through is not None and trained_through <= df["date"].iloc[gate_start(df)]
+
+
+def fine_tune(model, X_train, y_train, batch_size=32):
+    # Keeps the pipeline (scalers) of the current model so its inputs stay comparable.
+    # The test windows are held out as in a full retrain: the day appended today
+    # enters the fine-tuning data once it leaves the TEST_DAYS window.
+    X_recent, y_recent = X_train[-FINETUNE_DAYS:], y_train[-FINETUNE_DAYS:]
+    model.compile(optimizer=Adam(learning_rate=FINETUNE_LR), loss='mse')
+    model.fit(X_recent, y_recent, epochs=FINETUNE_EPOCHS, batch_size=batch_size, verbose=0)
+    return model, len(X_recent)
+
+
+def main(argv=None):
+    old_metrics = load_metrics()
+    current_head = (old_metrics or {}).get("head", "single")
+
+    parser = argparse.ArgumentParser(description="Train the LSTM AQI model")
+    parser.add_argument("--head", choices=HEADS, default=current_head,
+                        help="Output head (default: the head of the model currently saved)")
+    parser.add_argument("--mode", choices=MODES, default="auto",
+                        help="auto: fine-tune, with a full retrain on schedule or drift")
+    parser.add_argument("--config-from-leaderboard", nargs="?", const=LEADERBOARD_PATH, default=None,
+                        metavar="PATH", help=f"retrain with the best config of a search (default: {LEADERBOARD_PATH})")
+    parser.add_argument("--units", type=int, nargs="+", default=None, help="LSTM units per layer, e.g. 64 32")
+    parser.add_argument("--seq-len", type=int, default=None, help="days per input window")
+    parser.add_argument("--dropout", type=float, default=None)
+    parser.add_argument("--learning-rate", type=float, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    # Defaults < leaderboard's best trial < explicit flags
+    config = dict(DEFAULT_CONFIG)
+    if args.config_from_leaderboard:
+        config.update(leaderboard_config(args.head, args.config_from_leaderboard))
+    flags = {"units_per_layer": args.units, "seq_len": args.seq_len, "dropout": args.dropout,
+             "learning_rate": args.learning_rate, "batch_size": args.batch_size}
+    config.update({key: value for key, value in flags.items() if value is not None})
+    # A new architecture means a new model: fine-tuning keeps the current one's
+    architecture_given = args.config_from_leaderboard or any(
+        flags[key] is not None for key in ["units_per_layer", "seq_len", "dropout", "learning_rate"])
+    if architecture_given and args.mode == "finetune":
+        parser.error("--mode finetune keeps the current architecture; use --mode auto or full with these flags")
+    requested_mode = "full" if architecture_given else args.mode
+
+    os.makedirs(LSTM_MODEL_DIR, exist_ok=True)
+    df = load_training_data()
+    state = load_training_state()
+
+    # ----------------------
+    # Score the current model on the gate's origins, then pick the mode
+    # ----------------------
+    current = load_current(args.head)
+    current_oos = out_of_sample(old_metrics, df)
+    current_rmse, current_backtest = None, None
+    if current is not None:
+        model, pipeline = current
+        X_train, X_test, y_train, y_test = split_windows(df, pipeline)
+        # Before fine-tuning, which updates this same model in place
+        current_backtest = backtest(model, pipeline, df, TEST_DAYS)
+        current_rmse = current_backtest["overall"]["RMSE"]
+        print(f"📏 Current model backtest RMSE: {current_rmse:.2f}"
+              f"{'' if current_oos else ' (in sample: trained on these days)'}")
+    mode, reason = choose_mode(requested_mode, current, state, current_rmse, current_oos)
+    print(f"🛠️ Training mode: {mode} ({reason})")
+
+    if mode == "finetune":
+        model, n_train = fine_tune(model, X_train, y_train, config["batch_size"])
+        note = f"fine-tune {FINETUNE_EPOCHS} epochs on last {n_train} windows"
+    else:
+        # ----------------------
+        # Fit the feature pipeline (column order + scalers), saved with the model
+        # ----------------------
+        pipeline = fit_pipeline(df, args.head, config["seq_len"])
+        X_train, X_test, y_train, y_test = split_windows(df, pipeline)
+
+        # ----------------------
+        # Build & Train New Model
+        # ----------------------
+        print(f"🏗️ Config: {config}")
+        model = build_model(pipeline.seq_len, pipeline.n_features, pipeline.horizon, config["units_per_layer"],
+                            config["dropout"], config["learning_rate"])
+        es = EarlyStopping(patience=20, restore_best_weights=True)
+        model.fit(X_train, y_train, epochs=100, batch_size=config["batch_size"],
+                  validation_split=0.1, callbacks=[es], verbose=0)
+        n_train = len(X_train)
+        note = "EarlyStopping(patience=20)"
+
+    # ----------------------
+    # Evaluate New Model
+    # ----------------------
+    mae, rmse, r2, rmse_by_horizon = evaluate(model, pipeline, X_test, y_test)
+    print(f"\n📊 Evaluation on Test Set ({args.head} head, t+1):")
+    print(f"MAE: {mae:.2f}, RMSE: {rmse:.2f}, R2: {r2:.4f}")
+    if len(rmse_by_horizon) > 1:
+        print("RMSE by horizon: " + ", ".join(f"t+{k+1}: {v:.2f}" for k, v in enumerate(rmse_by_horizon)))
+
+    # ----------------------
+    # Compare with Old Model (if exists)
+    # ----------------------
+    # Walk-forward backtest over the held-out gate origins, t+1..t+3 as predict.py
+    # produces them; the current model is scored on the same origins
+    candidate_backtest = backtest(model, pipeline, df, TEST_DAYS)
+    print_report(candidate_backtest, "Candidate backtest")
+    if current_backtest is not None:
+        print_report(current_backtest, "Current model backtest")
+
+    update_model = True
+    if old_metrics is not None:
+        if args.head != current_head:
+            # The single head sees AQI_t+k as inputs, so its scores are not comparable
+            print(f"⚠️ Switching head {current_head} -> {args.head}; skipping the RMSE comparison.")
+        elif current_backtest is not None and not current_oos:
+            # Its score on days it was trained on is no benchmark for the candidate
+            print("⚠️ Current model was trained on the gate's days; skipping the RMSE comparison.")
+        elif current_backtest is not None:
+            new_score = candidate_backtest["overall"]["RMSE"]
+            old_score = current_backtest["overall"]["RMSE"]
+            if new_score >= old_score:
+                update_model = False
+                print(f"❌ New model did NOT outperform the current one (backtest RMSE {new_score:.2f} vs {old_score:.2f}). Not saving.")
+            else:
+                print(f"✅ New model is better (backtest RMSE {new_score:.2f} vs {old_score:.2f}). Saving.")
+        elif rmse >= old_metrics['RMSE']:
+            update_model = False
+            print("❌ New model did NOT outperform the previous one. Not saving.")
+        else:
+            print("✅ New model is better. Saving.")
+
+    # ----------------------
+    # Save Model if Better
+    # ----------------------
     metrics = {
+        "metrics_version": METRICS_VERSION,
         "MAE": round(mae, 2),
         "RMSE": round(rmse, 2),
-        "R2": round(r2, 4)
+        "R2": round(r2, 4),
+        "head": args.head,
+        # Last day the training windows read (inputs or targets): the gate's first origin
+        "trained_through": df["date"].iloc[gate_start(df)],
+        # Fine-tuning keeps the current model's architecture
+        "config": config if mode == "full" else (old_metrics or {}).get("config"),
     }
-    with open(METRICS_PATH, "w") as f:
-        json.dump(metrics, f, indent=2)
+    if len(rmse_by_horizon) > 1:
+        metrics["RMSE_by_horizon"] = [round(v, 2) for v in rmse_by_horizon]
+    metrics["backtest"] = candidate_backtest
+    if update_model:
+        save_artifacts(model, pipeline, metrics)
+        print("💾 Model, NumPy weights, feature pipeline, scalers, and metrics updated.")
+    else:
+        print("❌ Model not saved. Performance not improved.")
 
-    print("💾 Model, scalers, and metrics updated.")
-else:
-    print("❌ Model not saved. Performance not improved.")
-
-# ✅ LOGGING BLOCK
-log_entry = {
-    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    "status": "UPDATED" if update_model else "NOT UPDATED",
-    "model_name": "lstm_aqi_model.keras",
-    "train_samples": len(X_train),
-    "test_samples": len(X_test),
-    "MAE": round(mae, 2),
-    "RMSE": round(rmse, 2),
-    "R2": round(r2, 4),
-    "note": "EarlyStopping(patience=20)"
-}
+    # Drift reference: the serving model's backtest RMSE as of its last promotion / full retrain
+    if mode == "full":
+        state["last_full_retrain"] = datetime.now().strftime("%Y-%m-%d")
+    state.pop("reference_rmse", None)  # MSE-scale reference of earlier runs
+    if update_model:
+        state["reference_backtest_rmse"] = candidate_backtest["overall"]["RMSE"]
+    elif mode == "full" or "reference_backtest_rmse" not in state:
+        state["reference_backtest_rmse"] = (current_rmse if current_rmse is not None
+                                            else candidate_backtest["overall"]["RMSE"])
+    save_training_state(state)
 
-with open(LOG_PATH, "a") as log:
-    log.write(json.dumps(log_entry) + "\n")
+    # ✅ LOGGING BLOCK
+    write_log({
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "status": "UPDATED" if update_model else "NOT UPDATED",
+        "model_name": "lstm_aqi_model.keras",
+        "head": args.head,
+        "mode": mode,
+        "train_samples": n_train,
+        "test_samples": len(X_test),
+        "metrics_version": METRICS_VERSION,
+        "MAE": round(mae, 2),
+        "RMSE": round(rmse, 2),
+        "R2": round(r2, 4),
+        "backtest_RMSE": candidate_backtest["overall"]["RMSE"],
+        "current_backtest_RMSE": current_backtest["overall"]["RMSE"] if current_backtest else None,
+        "note": note
+    })
 
-# Show last update
-if os.path.exists(LOG_PATH):
-    with open(LOG_PATH, "r") as log:
-        lines = log.readlines()
-        print("\n🕒 Last Update Log:")
-        print(lines[-1].strip())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import os
+import hashlib
+import threading
+import joblib
+import numpy as np
+from src.feature_pipeline import PIPELINE_FILE, FeaturePipeline
+from src.numpy_lstm import WEIGHTS_FILE, NumpyLSTMModel, file_hash
+
+# -------------------
+# Configs & Paths
+# -------------------
+LSTM_MODEL_DIR = "lstm_model"
+MODEL_FILE = "lstm_aqi_model.keras"
+SCALER_X_FILE = "scaler_X.pkl"
+SCALER_Y_FILE = "scaler_y.pkl"
+
+# "numpy" runs the exported weights without importing TensorFlow, "keras" always loads
+# the .keras file, "auto" uses numpy when the export matches the current .keras file.
+ENGINES = ["auto", "numpy", "keras"]
+
+# One entry per (model directory, engine), shared by every caller in this process
+# (predict.py, create_lime.py and every Streamlit session of app.py).
+_lock = threading.Lock()
+_artifacts = {}
+_versions = {}
+
+
+def artifact_paths(model_dir=LSTM_MODEL_DIR):
+    return {
+        "model": os.path.join(model_dir, MODEL_FILE),
+        "scaler_X": os.path.join(model_dir, SCALER_X_FILE),
+        "scaler_y": os.path.join(model_dir, SCALER_Y_FILE),
+        "pipeline": os.path.join(model_dir, PIPELINE_FILE),  # optional for models trained before it existed
+        "weights": os.path.join(model_dir, WEIGHTS_FILE),  # NumPy export of the model, optional
+    }
+
+
+def stat_stamp(paths):
+    # Cheap change detector: (mtime, size) of every artifact file
+    stamp = []
+    for path in paths:
+        if not os.path.exists(path):
+            stamp.append(None)
+            continue
+        st = os.stat(path)
+        stamp.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+
+def _content_hash(paths):
+    h = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def model_version(model_dir=LSTM_MODEL_DIR):
+    # Content hash of the model + scalers + feature pipeline. Files are only re-hashed when their
+    # mtime/size changes, so this is a few stat() calls on the hot path. The NumPy export is
+    # derived from the model file, so it does not change the version.
+    paths = [path for name, path in artifact_paths(model_dir).items() if name != "weights"]
+    stamp = stat_stamp(paths)
+    cached = _versions.get(model_dir)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    version = _content_hash(paths)
+    _versions[model_dir] = (stamp, version)
+    return version
+
+
+def _load_model(paths, engine):
+    # -> (model, engine actually used)
+    if engine != "keras" and os.path.exists(paths["weights"]):
+        model = NumpyLSTMModel.load(paths["weights"])
+        if engine == "numpy" or model.source_hash == file_hash(paths["model"]):
+            return model, "numpy"
+        print(f"⚠️ {paths['weights']} was exported from a different model file, using Keras")
+    elif engine == "numpy":
+        raise FileNotFoundError(f"{paths['weights']} not found, run python -m src.numpy_lstm")
+
+    from tensorflow.keras.models import load_model  # heavy, import on first load only
+    return load_model(paths["model"]), "keras"
+
+
+def get_artifacts(model_dir=LSTM_MODEL_DIR, engine="auto"):
+    # Returns warm handles {"model", "pipeline", "scaler_X", "scaler_y", "version", "engine"}.
+    # Reloads only when the files written by lstm_model_training.py change.
+    version = model_version(model_dir)
+    key = (model_dir, engine)
+    cached = _artifacts.get(key)
+    if cached is not None and cached["version"] == version:
+        return cached
+
+    with _lock:
+        cached = _artifacts.get(key)
+        if cached is not None and cached["version"] == version:
+            return cached
+
+        paths = artifact_paths(model_dir)
+        try:
+            scaler_X = joblib.load(paths["scaler_X"])
+            scaler_y = joblib.load(paths["scaler_y"])
+            if os.path.exists(paths["pipeline"]):
+                pipeline = FeaturePipeline.load(paths["pipeline"])
+            else:
+                pipeline = FeaturePipeline.from_legacy_scalers(scaler_X, scaler_y)
+            model, used_engine = _load_model(paths, engine)
+            artifacts = {
+                "model": model,
+                "pipeline": pipeline,
+                "scaler_X": scaler_X,
+                "scaler_y": scaler_y,
+                "version": version,
+                "model_dir": model_dir,
+                "engine": used_engine,
+            }
+        except Exception as e:
+            # Training may be mid-write; keep serving the previous model if we have one
+            if cached is None:
+                raise
+            print(f"⚠️ Failed to reload model from {model_dir}, keeping version {cached['version']}: {e}")
+            return cached
+
+        _artifacts[key] = artifacts
+        print(f"📦 Loaded model {MODEL_FILE} (version {version}, {used_engine} engine) from {model_dir}")
+        return artifacts
+
+
+def predict_batch(model, x):
+    # Direct forward pass for large batches: skips Keras predict()'s per-call setup
+    # (tf.data pipeline, callbacks, progress bar). NumPy models are already direct.
+    if isinstance(model, NumpyLSTMModel):
+        return model.predict(x)
+    return np.asarray(model(np.asarray(x, dtype=np.float32), training=False))
+
+
+def clear(model_dir=None):
+    with _lock:
+        if model_dir is None:
+            _artifacts.clear()
+            _versions.clear()
+        else:
+            for key in [key for key in _artifacts if key[0] == model_dir]:
+                _artifacts.pop(key)
+            _versions.pop(model_dir, None)
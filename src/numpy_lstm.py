@@ -0,0 +1,150 @@
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+
+WEIGHTS_FILE = "lstm_aqi_weights.npz"
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 0.5 * (1.0 + np.tanh(0.5 * x)),  # overflow-free form
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+# -------------------
+# Export (needs TensorFlow, runs in training)
+# -------------------
+def export_weights(model, weights_path, source_path=None):
+    # Sequential LSTM/Dropout/Dense stack -> one .npz of plain arrays + a JSON layer spec.
+    # source_path: the .keras file these weights come from; its hash is stored so the
+    # runtime can tell when the export is out of date.
+    layers, arrays = [], {}
+    for i, layer in enumerate(model.layers):
+        kind = type(layer).__name__
+        config = layer.get_config()
+        if kind == "LSTM":
+            spec = {"type": kind, "units": config["units"], "activation": config["activation"],
+                    "recurrent_activation": config["recurrent_activation"],
+                    "return_sequences": config["return_sequences"]}
+        elif kind == "Dense":
+            spec = {"type": kind, "activation": config["activation"]}
+        elif kind in ("Dropout", "InputLayer"):
+            continue  # no-ops at inference
+        else:
+            raise ValueError(f"Cannot export layer {layer.name} of type {kind}")
+        for j, w in enumerate(layer.get_weights()):
+            arrays[f"layer{i}_w{j}"] = w
+        spec["weights"] = [f"layer{i}_w{j}" for j in range(len(layer.get_weights()))]
+        layers.append(spec)
+
+    meta = {"layers": layers, "source_hash": file_hash(source_path) if source_path else None}
+    tmp_path = weights_path + ".tmp.npz"
+    np.savez(tmp_path, __meta__=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, weights_path)
+    return weights_path
+
+
+# -------------------
+# NumPy inference engine
+# -------------------
+class NumpyLSTMModel:
+    # Drop-in for the Keras model at inference time: predict(x) with x of shape
+    # (batch, seq_len, n_features). Keras LSTM gate order is i, f, c, o.
+    # Computes in float32 like Keras does (faster than float64 for LIME-sized batches).
+    def __init__(self, layers, arrays):
+        self.layers = []
+        for spec in layers:
+            weights = [np.asarray(arrays[name], dtype=np.float32) for name in spec["weights"]]
+            self.layers.append((spec, weights))
+        self.source_hash = None
+
+    @classmethod
+    def load(cls, weights_path):
+        with np.load(weights_path) as data:
+            meta = json.loads(str(data["__meta__"]))
+            arrays = {k: data[k] for k in data.files if k != "__meta__"}
+        model = cls(meta["layers"], arrays)
+        model.source_hash = meta.get("source_hash")
+        return model
+
+    @staticmethod
+    def _lstm(x, spec, weights):
+        kernel, recurrent_kernel, bias = weights
+        act = ACTIVATIONS[spec["activation"]]
+        rec_act = ACTIVATIONS[spec["recurrent_activation"]]
+        units = spec["units"]
+
+        batch, steps, _ = x.shape
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        # Input projection for all timesteps at once; only the recurrence is sequential
+        x_proj = x @ kernel + bias
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if spec["return_sequences"] else None
+        for t in range(steps):
+            z = x_proj[:, t] + h @ recurrent_kernel
+            i = rec_act(z[:, :units])
+            f = rec_act(z[:, units:2 * units])
+            g = act(z[:, 2 * units:3 * units])
+            o = rec_act(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * act(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+    def predict(self, x, verbose=0, batch_size=None):
+        x = np.ascontiguousarray(x, dtype=np.float32)  # also materializes broadcast views
+        for spec, weights in self.layers:
+            if spec["type"] == "LSTM":
+                x = self._lstm(x, spec, weights)
+            else:
+                x = ACTIVATIONS[spec["activation"]](x @ weights[0] + weights[1])
+        return x
+
+    __call__ = predict
+
+
+# -------------------
+# CLI: export an existing Keras model and check it matches
+# -------------------
+def verify(keras_model, numpy_model, n_features, seq_len=7, n_samples=256, seed=0):
+    x = np.random.default_rng(seed).random((n_samples, seq_len, n_features)).astype(np.float32)
+    expected = keras_model.predict(x, verbose=0)
+    return float(np.max(np.abs(expected - numpy_model.predict(x))))
+
+
+def main(argv=None):
+    from src.model_registry import LSTM_MODEL_DIR, artifact_paths
+
+    parser = argparse.ArgumentParser(description="Export the Keras LSTM to NumPy weights")
+    parser.add_argument("--model-dir", default=LSTM_MODEL_DIR)
+    args = parser.parse_args(argv)
+
+    from tensorflow.keras.models import load_model
+
+    paths = artifact_paths(args.model_dir)
+    model_path, weights_path = paths["model"], paths["weights"]
+    keras_model = load_model(model_path)
+    export_weights(keras_model, weights_path, model_path)
+    print(f"💾 Exported weights to {weights_path}")
+
+    _, seq_len, n_features = keras_model.input_shape
+    max_err = verify(keras_model, NumpyLSTMModel.load(weights_path), n_features, seq_len)
+    print(f"🔍 Max abs difference vs Keras: {max_err:.2e}")
+    if max_err > 1e-4:
+        raise SystemExit("❌ NumPy engine does not match Keras")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from src import data_store
+from src.preprocess_daily_data import PROCESSED_DATA_PATH, STATE_PATH
+from src.model_registry import LSTM_MODEL_DIR, artifact_paths
+from src.predict import PREDICTIONS_PATH, FORECAST_ARTIFACT_PATH
+from src.create_lime import SAVE_DIR, CSV_NAME, HTML_NAME, PNG_NAME
+from src.sequence_explain import CSV_PATH as SEQUENCE_CSV_PATH
+from src.fetch_data import HOURLY_PATH
+from src.hourly_features import HOURLY_MODEL_DIR
+from src.predict_hourly import HOURLY_PREDICTIONS_PATH
+from src.locations import load_locations, location_path
+
+# -------------------
+# Configs & Paths
+# -------------------
+PIPELINE_STATE_PATH = "pipeline_state.json"
+MODEL_FILES = list(artifact_paths(LSTM_MODEL_DIR).values())
+METRICS_PATH = os.path.join(LSTM_MODEL_DIR, "metrics.json")
+HOURLY_MODEL_FILES = list(artifact_paths(HOURLY_MODEL_DIR).values())
+
+# Each stage runs as `python -m <module>`. It is skipped when the hashes of its
+# inputs (data files + its own source code) match the last successful run and its
+# outputs are still as that run left them. Stages with no inputs always run.
+#
+# "update" fetches every location at once (one process, one shared HTTP session).
+# The stages in STAGES run once per location (see locations.json) with the location's
+# root as working directory: their "inputs"/"outputs" are relative to that root, "code"
+# to the repository.
+UPDATE_STAGE = {
+    "name": "update",
+    "module": "src.update_locations",
+    "after": [],
+    "inputs": [],  # depends on today's date and the API, always runs (cheap when up to date)
+    "code": [],
+    "outputs": [data_store.DB_PATH, HOURLY_PATH],
+}
+
+STAGES = [
+    {
+        "name": "preprocess",
+        "module": "src.preprocess_daily_data",
+        "after": ["update"],
+        "inputs": [data_store.DB_PATH],
+        "code": ["src/preprocess_daily_data.py"],
+        "outputs": [PROCESSED_DATA_PATH, STATE_PATH],
+    },
+    {
+        "name": "train",
+        "module": "src.lstm_model_training",
+        "after": ["preprocess"],
+        "inputs": [PROCESSED_DATA_PATH],
+        "code": ["src/lstm_model_training.py", "src/feature_pipeline.py", "src/windowing.py", "src/backtest.py"],
+        "outputs": MODEL_FILES + [METRICS_PATH],
+    },
+    {
+        "name": "predict",
+        "module": "src.predict",
+        "after": ["train"],
+        "inputs": [PROCESSED_DATA_PATH] + MODEL_FILES,
+        "code": ["src/predict.py", "src/numpy_lstm.py"],
+        "outputs": [PREDICTIONS_PATH, FORECAST_ARTIFACT_PATH],
+    },
+    {
+        "name": "lime",
+        "module": "src.create_lime",
+        "after": ["train"],
+        "inputs": [PROCESSED_DATA_PATH] + MODEL_FILES,
+        "code": ["src/create_lime.py", "src/numpy_lstm.py"],
+        "outputs": [os.path.join(SAVE_DIR, name) for name in (CSV_NAME, HTML_NAME, PNG_NAME)],
+    },
+    {
+        "name": "explain",
+        "module": "src.sequence_explain",
+        "after": ["train"],
+        "inputs": [PROCESSED_DATA_PATH] + MODEL_FILES,
+        "code": ["src/sequence_explain.py", "src/numpy_lstm.py"],
+        "outputs": [SEQUENCE_CSV_PATH],
+    },
+    # Hourly model (72 hours ahead), independent of the daily stages above. The hourly file
+    # changes every run, so hourly_train always starts, but it only retrains once
+    # RETRAIN_MIN_HOURS new hours have arrived (see src/hourly_model_training.py)
+    {
+        "name": "hourly_train",
+        "module": "src.hourly_model_training",
+        "after": ["update"],
+        "inputs": [HOURLY_PATH],
+        "code": ["src/hourly_model_training.py", "src/hourly_features.py", "src/windowing.py"],
+        "outputs": HOURLY_MODEL_FILES + [os.path.join(HOURLY_MODEL_DIR, "metrics.json")],
+    },
+    {
+        "name": "hourly_predict",
+        "module": "src.predict_hourly",
+        "after": ["hourly_train"],
+        "inputs": [HOURLY_PATH] + HOURLY_MODEL_FILES,
+        "code": ["src/predict_hourly.py", "src/hourly_features.py"],
+        "outputs": [HOURLY_PREDICTIONS_PATH],
+    },
+]
+
+
+def expand_stages(locations, stages=STAGES):
+    # One copy of every stage per location, with paths resolved against the location's root.
+    # The default location keeps the plain stage names (and so its recorded state).
+    expanded = [dict(UPDATE_STAGE, stage="update", cwd=".",
+                     args=["--locations"] + list(locations),
+                     outputs=[location_path(loc["root"], path) for loc in locations.values()
+                              for path in UPDATE_STAGE["outputs"]])]
+    for loc_id, loc in locations.items():
+        root = loc["root"]
+        suffix = "" if root == "." else f"@{loc_id}"
+        for stage in stages:
+            expanded.append(dict(
+                stage,
+                name=stage["name"] + suffix,
+                stage=stage["name"],
+                after=[dep if dep == "update" else dep + suffix for dep in stage["after"]],
+                inputs=[location_path(root, path) for path in stage["inputs"]] + stage["code"],
+                outputs=[location_path(root, path) for path in stage["outputs"]],
+                cwd=root,
+            ))
+    return expanded
+
+
+# -------------------
+# Hashing & state
+# -------------------
+def file_hash(path):
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def hashes(paths):
+    return {path: file_hash(path) for path in paths}
+
+
+def load_pipeline_state(path=PIPELINE_STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_pipeline_state(state, path=PIPELINE_STATE_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(stage, record):
+    # -> (skip?, reason)
+    if not stage["inputs"]:
+        return False, "always runs"
+    if record is None:
+        return False, "never ran"
+    if record["inputs"] != hashes(stage["inputs"]):
+        changed = [p for p, h in hashes(stage["inputs"]).items() if record["inputs"].get(p) != h]
+        return False, f"changed: {', '.join(changed)}"
+    if record["outputs"] != hashes(stage["outputs"]):
+        return False, "outputs missing or modified"
+    return True, "inputs unchanged"
+
+
+# -------------------
+# Running stages
+# -------------------
+def run_stage(stage):
+    # -> (returncode, seconds, combined output); output is captured so parallel stages don't interleave.
+    # Runs in the stage's location root, with the repository on the path for `src`
+    start = time.perf_counter()
+    os.makedirs(stage["cwd"], exist_ok=True)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run([sys.executable, "-m", stage["module"]] + stage.get("args", []), cwd=stage["cwd"],
+                          env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    return proc.returncode, time.perf_counter() - start, proc.stdout
+
+
+def waves(stages):
+    # Groups stages so that each group only depends on earlier groups; a group runs in parallel
+    done, pending, groups = set(), list(stages), []
+    while pending:
+        ready = [s for s in pending if all(dep in done for dep in s["after"])]
+        if not ready:
+            raise ValueError(f"Unsatisfiable stage dependencies: {[s['name'] for s in pending]}")
+        groups.append(ready)
+        done.update(s["name"] for s in ready)
+        pending = [s for s in pending if s not in ready]
+    return groups
+
+
+def run_pipeline(force=(), state_path=PIPELINE_STATE_PATH, stages=None, workers=None):
+    # force: stage names ("train@hyderabad"), base names ("train" = every location) or "all".
+    # Stages of a wave run as subprocesses, at most `workers` at a time. A failed stage
+    # only stops the stages that depend on it (e.g. the same location's later stages).
+    stages = stages if stages is not None else expand_stages(load_locations())
+    workers = workers or os.cpu_count() or 1
+    state = load_pipeline_state(state_path)
+    total_start = time.perf_counter()
+    failed = []
+
+    for group in waves(stages):
+        to_run = []
+        for stage in group:
+            blocked_by = [dep for dep in stage["after"] if dep in failed]
+            if blocked_by:
+                failed.append(stage["name"])
+                print(f"⛔ {stage['name']}: not run ({', '.join(blocked_by)} failed)")
+                continue
+            skip, reason = is_up_to_date(stage, state.get(stage["name"]))
+            forced = {stage["name"], stage["stage"], "all"} & set(force)
+            if skip and not forced:
+                print(f"⏭️ {stage['name']}: skipped ({reason})")
+            else:
+                print(f"▶ {stage['name']}: running ({'forced' if skip else reason})")
+                to_run.append(stage)
+        if not to_run:
+            continue
+
+        # Input hashes are taken before the stage runs, so a change made while it
+        # runs is picked up next time
+        input_hashes = {stage["name"]: hashes(stage["inputs"]) for stage in to_run}
+        with ThreadPoolExecutor(max_workers=min(workers, len(to_run))) as pool:
+            results = list(pool.map(run_stage, to_run))
+
+        for stage, (returncode, seconds, output) in zip(to_run, results):
+            print(f"\n----- {stage['name']} ({seconds:.1f}s) -----")
+            print(output.rstrip())
+            if returncode != 0:
+                failed.append(stage["name"])
+                continue
+            state[stage["name"]] = {
+                "inputs": input_hashes[stage["name"]],
+                "outputs": hashes(stage["outputs"]),
+                "finished_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "seconds": round(seconds, 1),
+            }
+        save_pipeline_state(state, state_path)
+
+    if failed:
+        print(f"\n❌ Pipeline failed at: {', '.join(failed)}")
+        return False
+    print(f"\n✅ Pipeline finished in {time.perf_counter() - total_start:.1f}s")
+    return True
+
+
+def main(argv=None):
+    locations = load_locations()
+    parser = argparse.ArgumentParser(description="Run the update → train → predict stages of every location, skipping unchanged ones")
+    parser.add_argument("--locations", nargs="*", choices=list(locations), default=list(locations))
+    parser.add_argument("--force", nargs="*", default=[],
+                        help="run these stages even if their inputs are unchanged: a stage name "
+                             "(train, train@hyderabad, ...) or all")
+    parser.add_argument("--workers", type=int, default=None, help="stages run at once (default: CPU cores)")
+    parser.add_argument("--state", default=PIPELINE_STATE_PATH)
+    args = parser.parse_args(argv)
+
+    stages = expand_stages({loc_id: locations[loc_id] for loc_id in args.locations})
+    unknown = set(args.force) - {s["name"] for s in stages} - {s["stage"] for s in stages} - {"all"}
+    if unknown:
+        parser.error(f"unknown stage(s) for --force: {', '.join(sorted(unknown))}")
+    if not run_pipeline(args.force, args.state, stages, args.workers):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
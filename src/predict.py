@@ -1,138 +1,201 @@
 import os
+import json
+import argparse
 import numpy as np
 import pandas as pd
-import joblib
-from datetime import timedelta
-from tensorflow.keras.models import load_model
+from datetime import datetime, timedelta
+from src.model_registry import LSTM_MODEL_DIR, get_artifacts, model_version
+from src.preprocess_daily_data import read_tail
+from src.backtest import forecast_origins
+from src.locations import load_locations, location_path
 
 # -------------------
 # Configs & Paths
 # -------------------
-LSTM_MODEL_DIR = "lstm_model"
-MODEL_PATH = os.path.join(LSTM_MODEL_DIR, "lstm_aqi_model.keras")
-SCALER_X_PATH = os.path.join(LSTM_MODEL_DIR, "scaler_X.pkl")
-SCALER_Y_PATH = os.path.join(LSTM_MODEL_DIR, "scaler_y.pkl")
 DATA_PATH = "processed_data/daily_karachi_preprocessed.csv"
+PREDICTIONS_DIR = "predictions"
+PREDICTIONS_PATH = os.path.join(PREDICTIONS_DIR, "next_3_days.csv")
+LOCATIONS_PREDICTIONS_PATH = os.path.join(PREDICTIONS_DIR, "next_3_days_by_location.csv")
+FORECAST_ARTIFACT_PATH = os.path.join(PREDICTIONS_DIR, "forecast.json")
+FORECAST_SCHEMA_VERSION = 1
 
-SEQ_LEN = 7
+HORIZON = 3
 
-# -------------------
-# Load model & scalers
-# -------------------
-model = load_model(MODEL_PATH)
-scaler_X = joblib.load(SCALER_X_PATH)
-scaler_y = joblib.load(SCALER_Y_PATH)
 
 # -------------------
 # Load & prepare data
 # -------------------
-df = pd.read_csv(DATA_PATH)
-df["ds"] = pd.to_datetime(df["date"])
-df["y"] = df["AQI"]
-
-features = [
-    'AQI', 'PM10', 'NO2', 'SO2', 'O3', 'Temperature', 'Humidity',
-    'Precipitation', 'month', 'log_PM2.5', 'log_CO', 'season_Spring',
-    'season_Summer', 'season_Winter', 'weekday_1', 'weekday_2', 'weekday_3',
-    'weekday_4', 'weekday_5', 'weekday_6', 'AQI_t+1', 'AQI_t+2', 'AQI_t+3',
-    'AQI_lag_1', 'AQI_lag_2', 'AQI_roll_mean_3', 'AQI_roll_std_3',
-    'AQI_diff'
-] + [col for col in df.columns if col.startswith("season_") or col.startswith("weekday_")]
-
-# Ensure latest valid sequence
-df_latest = df[features].copy()
-X_all = scaler_X.transform(df_latest)
-last_seq = X_all[-SEQ_LEN:]
+def load_data(data_path=DATA_PATH, n_rows=None):
+    # n_rows: only read the latest rows, from the end of the file
+    df = read_tail(data_path, n_rows)[0] if n_rows else pd.read_csv(data_path)
+    df["ds"] = pd.to_datetime(df["date"])
+    df["y"] = df["AQI"]
+    return df
+
 
 # -------------------
 # Forecast Next 3 Days
 # -------------------
-predictions = []
-input_seq = last_seq.copy()
+def forecast(df, artifacts):
+    # One location: a batch of one window
+    return forecast_batch({None: df}, {None: artifacts}).drop(columns=["Location", "Model_Version"])
+
+
+def forecast_batch(frames, artifacts_by_location):
+    # frames: {location: processed rows (at least seq_len)}, artifacts_by_location: {location: artifacts}.
+    # The latest windows of all locations served by the same model version are stacked into
+    # one (n_locations, seq_len, n_features) tensor: one forward pass for a direct head,
+    # HORIZON passes for the autoregressive one, however many locations share the model.
+    # Returns a tidy frame: Location, Date, Predicted_AQI, Model_Version.
+    by_version = {}
+    for location, artifacts in artifacts_by_location.items():
+        by_version.setdefault(artifacts["version"], []).append(location)
+
+    parts = []
+    for version, group in by_version.items():
+        artifacts = artifacts_by_location[group[0]]
+        pipeline = artifacts["pipeline"]
+        windows = np.stack([pipeline.transform_window(frames[location]) for location in group])
+        predictions = forecast_origins(artifacts["model"], pipeline, windows, HORIZON)
+
+        for location, location_predictions in zip(group, predictions):
+            last_date = pd.to_datetime(frames[location]["date"]).max()
+            parts.append(pd.DataFrame({
+                "Location": location,
+                "Date": [(last_date + timedelta(days=i + 1)).strftime("%Y-%m-%d") for i in range(HORIZON)],
+                "Predicted_AQI": np.round(location_predictions.astype(float), 2),
+                "Model_Version": version,
+            }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def predict_locations(location_ids=None, locations=None, model_dir=None):
+    # Batched forecast for several locations (default: all in locations.json), each with its
+    # own model unless model_dir is given, in which case that one model serves them all
+    # (e.g. districts served by the city model) in a single call
+    locations = locations or load_locations()
+    location_ids = location_ids or list(locations)
+    unknown = [location_id for location_id in location_ids if location_id not in locations]
+    if unknown:
+        raise ValueError(f"Unknown location(s) {unknown}, expected some of {list(locations)}")
+    frames, artifacts_by_location = {}, {}
+    for location_id in location_ids:
+        root = locations[location_id]["root"]
+        if not os.path.exists(location_path(root, DATA_PATH)):
+            print(f"⚠️ {location_id}: no processed data yet, skipped")
+            continue
+        artifacts = get_artifacts(model_dir or location_path(root, LSTM_MODEL_DIR))
+        frames[location_id] = load_data(location_path(root, DATA_PATH), artifacts["pipeline"].seq_len)
+        artifacts_by_location[location_id] = artifacts
+    if not frames:
+        raise RuntimeError(f"No location could be forecast: none of {location_ids} has processed data yet")
+    return forecast_batch(frames, artifacts_by_location)
+
+
+def predict_next_3_days(data_path=DATA_PATH, model_dir=LSTM_MODEL_DIR):
+    # Side-effect free: nothing is written, model comes warm from the registry
+    artifacts = get_artifacts(model_dir)
+    return forecast(load_data(data_path, artifacts["pipeline"].seq_len), artifacts)
+
+
+def save_predictions(results, output_path=PREDICTIONS_PATH):
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    results.to_csv(output_path, index=False)
+    print(f"💾 Predictions saved to {output_path}")
 
-for i in range(3):
-    input_batch = np.expand_dims(input_seq, axis=0)  # shape: (1, 7, num_features)
-    pred_scaled = model.predict(input_batch)
-    pred = scaler_y.inverse_transform(pred_scaled)[0][0]
-    predictions.append(pred)
-
-    # Create dummy next step with predicted AQI
-    next_input = input_seq[-1].copy()
-    # Replace AQI (assume it's the first column) with predicted value
-    next_input[0] = pred_scaled[0][0]
-
-    # Update input_seq with new step
-    input_seq = np.concatenate([input_seq[1:], [next_input]])
 
 # -------------------
-# Prepare output
+# Forecast artifact
 # -------------------
-last_date = df["ds"].max()
-future_dates = [last_date + timedelta(days=i+1) for i in range(3)]
-results = pd.DataFrame({
-    "Date": [d.strftime("%Y-%m-%d") for d in future_dates],
-    "Predicted_AQI": np.round(predictions, 2)
-})
-
-print("\n📈 Next 3 Days AQI Prediction:")
-print(results.to_string(index=False))
-
-# Save results
-os.makedirs("predictions", exist_ok=True)
-results.to_csv("predictions/next_3_days.csv", index=False)
-
+def data_watermark(data_path=DATA_PATH):
+    # Date of the last processed row, read from the end of the file (O(1) in history length)
+    with open(data_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    return lines[-1].split(b",", 1)[0].decode()
+
+
+def save_forecast_artifact(results, watermark, version, artifact_path=FORECAST_ARTIFACT_PATH):
+    artifact = {
+        "schema_version": FORECAST_SCHEMA_VERSION,
+        "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "model_version": version,
+        "data_watermark": watermark,
+        "forecast": results.to_dict(orient="records"),
+    }
+    os.makedirs(os.path.dirname(artifact_path) or ".", exist_ok=True)
+    tmp_path = artifact_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(artifact, f, indent=2, default=float)
+    os.replace(tmp_path, artifact_path)  # readers never see a half-written file
+    print(f"💾 Forecast artifact saved to {artifact_path}")
+
+
+def load_forecast_artifact(artifact_path=FORECAST_ARTIFACT_PATH, data_path=DATA_PATH, model_dir=LSTM_MODEL_DIR):
+    # Returns the stored forecast, or None if missing or stale w.r.t. the data / model on disk
+    if not os.path.exists(artifact_path):
+        return None
+    with open(artifact_path, "r") as f:
+        artifact = json.load(f)
+
+    if artifact.get("schema_version") != FORECAST_SCHEMA_VERSION:
+        return None
+    if artifact.get("data_watermark") != data_watermark(data_path):
+        return None
+    if artifact.get("model_version") != model_version(model_dir):
+        return None
+    return artifact
+
+
+def get_forecast(data_path=DATA_PATH, model_dir=LSTM_MODEL_DIR, artifact_path=FORECAST_ARTIFACT_PATH):
+    # Read path for the dashboard: serve the pipeline's artifact, infer live only if it is stale
+    artifact = load_forecast_artifact(artifact_path, data_path, model_dir)
+    if artifact is not None:
+        return pd.DataFrame(artifact["forecast"])
+    print("⚠️ Forecast artifact missing or stale, running live inference.")
+    return predict_next_3_days(data_path, model_dir)
 
-def predict_next_3_days():
-    # Load model & scalers
-    model = load_model(MODEL_PATH)
-    scaler_X = joblib.load(SCALER_X_PATH)
-    scaler_y = joblib.load(SCALER_Y_PATH)
 
-    # Load & prepare data
-    df = pd.read_csv(DATA_PATH)
-    df["ds"] = pd.to_datetime(df["date"])
-    df["y"] = df["AQI"]
-
-    features = [
-        'AQI', 'PM10', 'NO2', 'SO2', 'O3', 'Temperature', 'Humidity',
-        'Precipitation', 'month', 'log_PM2.5', 'log_CO', 'season_Spring',
-        'season_Summer', 'season_Winter', 'weekday_1', 'weekday_2', 'weekday_3',
-        'weekday_4', 'weekday_5', 'weekday_6', 'AQI_t+1', 'AQI_t+2', 'AQI_t+3',
-        'AQI_lag_1', 'AQI_lag_2', 'AQI_roll_mean_3', 'AQI_roll_std_3',
-        'AQI_diff'
-    ] + [col for col in df.columns if col.startswith("season_") or col.startswith("weekday_")]
-
-    # Ensure latest valid sequence
-    df_latest = df[features].copy()
-    X_all = scaler_X.transform(df_latest)
-    last_seq = X_all[-SEQ_LEN:]
-
-    # Forecast Next 3 Days
-    predictions = []
-    input_seq = last_seq.copy()
-
-    for i in range(3):
-        input_batch = np.expand_dims(input_seq, axis=0)
-        pred_scaled = model.predict(input_batch)
-        pred = scaler_y.inverse_transform(pred_scaled)[0][0]
-        predictions.append(pred)
-
-        # Create dummy next step
-        next_input = input_seq[-1].copy()
-        next_input[0] = pred_scaled[0][0]
-        input_seq = np.concatenate([input_seq[1:], [next_input]])
-
-    # Prepare output
-    last_date = df["ds"].max()
-    future_dates = [last_date + timedelta(days=i+1) for i in range(3)]
-    results = pd.DataFrame({
-        "Date": [d.strftime("%Y-%m-%d") for d in future_dates],
-        "Predicted_AQI": np.round(predictions, 2)
-    })
+# -------------------
+# CLI entry point
+# -------------------
+def main(argv=None):
+    locations = load_locations()
+    parser = argparse.ArgumentParser(description="Forecast Karachi AQI for the next 3 days.")
+    parser.add_argument("--data", default=DATA_PATH, help="processed daily data CSV")
+    parser.add_argument("--model-dir", default=None,
+                        help=f"directory holding the model and scalers (default: {LSTM_MODEL_DIR}; "
+                             "with --locations: each location's own model)")
+    parser.add_argument("--output", default=None, help="where to write the forecast CSV")
+    parser.add_argument("--artifact", default=FORECAST_ARTIFACT_PATH, help="where to write the forecast artifact")
+    parser.add_argument("--locations", nargs="*", choices=list(locations), default=None,
+                        help="batched forecast for these locations (none listed: all in locations.json)")
+    parser.add_argument("--no-save", action="store_true", help="print the forecast without writing it")
+    args = parser.parse_args(argv)
+
+    if args.locations is not None:
+        try:
+            results = predict_locations(args.locations, locations, model_dir=args.model_dir)
+        except RuntimeError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"\n📈 Next 3 Days AQI Prediction ({results['Location'].nunique()} locations, "
+              f"{results['Model_Version'].nunique()} model call group(s)):")
+        print(results.to_string(index=False))
+        if not args.no_save:
+            save_predictions(results, args.output or LOCATIONS_PREDICTIONS_PATH)
+        return results
+
+    model_dir = args.model_dir or LSTM_MODEL_DIR
+    results = predict_next_3_days(args.data, model_dir)
+    print("\n📈 Next 3 Days AQI Prediction:")
+    print(results.to_string(index=False))
 
+    if not args.no_save:
+        save_predictions(results, args.output or PREDICTIONS_PATH)
+        save_forecast_artifact(results, data_watermark(args.data), model_version(model_dir), args.artifact)
     return results
 
+
 if __name__ == "__main__":
-    results = predict_next_3_days()
-    print("\n📈 Next 3 Days AQI Prediction:")
-    print(results.to_string(index=False))
+    main()
@@ -0,0 +1,76 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from src.fetch_data import HOURLY_PATH
+from src.hourly_features import HOURLY_MODEL_DIR, CONTEXT_HOURS, load_hourly, build_hourly_features
+from src.model_registry import artifact_paths, get_artifacts, predict_batch
+from src.predict import PREDICTIONS_DIR, data_watermark, save_predictions
+
+# -------------------
+# Configs & Paths
+# -------------------
+HOURLY_PREDICTIONS_PATH = os.path.join(PREDICTIONS_DIR, "next_72_hours.csv")
+
+
+# -------------------
+# Forecast the next 72 hours (direct head, one forward pass)
+# -------------------
+def forecast_hourly(raw, artifacts):
+    pipeline = artifacts["pipeline"]
+    df = build_hourly_features(raw, pipeline.preprocess_state)
+    window = pipeline.transform_window(df).astype(np.float32)
+    predictions = pipeline.inverse_target(predict_batch(artifacts["model"], window[np.newaxis]))[0]
+
+    last_time = df["time"].iloc[-1]
+    return pd.DataFrame({
+        "Time": pd.date_range(last_time + pd.Timedelta(hours=1), periods=len(predictions), freq="h")
+                  .strftime("%Y-%m-%d %H:%M:%S"),
+        "Predicted_AQI": np.round(predictions, 2),
+    })
+
+
+def predict_next_72_hours(data_path=HOURLY_PATH, model_dir=HOURLY_MODEL_DIR):
+    # Only the latest window (+ lag history) is read, from the end of the hourly file
+    artifacts = get_artifacts(model_dir)
+    n_rows = artifacts["pipeline"].seq_len + CONTEXT_HOURS
+    return forecast_hourly(load_hourly(data_path, n_rows), artifacts)
+
+
+def get_hourly_forecast(data_path=HOURLY_PATH, model_dir=HOURLY_MODEL_DIR,
+                        predictions_path=HOURLY_PREDICTIONS_PATH):
+    # Read path for the dashboard: the pipeline's CSV if it starts right after the last
+    # observed hour, else live inference; None when no hourly model has been trained
+    if os.path.exists(predictions_path):
+        stored = pd.read_csv(predictions_path)
+        expected = pd.Timestamp(data_watermark(data_path)) + pd.Timedelta(hours=1)
+        if len(stored) and pd.Timestamp(stored["Time"].iloc[0]) == expected:
+            return stored
+    if not os.path.exists(artifact_paths(model_dir)["model"]):
+        return None
+    print("⚠️ Hourly forecast missing or stale, running live inference.")
+    return predict_next_72_hours(data_path, model_dir)
+
+
+# -------------------
+# CLI entry point
+# -------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast Karachi AQI for the next 72 hours.")
+    parser.add_argument("--data", default=HOURLY_PATH, help="hourly data CSV")
+    parser.add_argument("--model-dir", default=HOURLY_MODEL_DIR)
+    parser.add_argument("--output", default=HOURLY_PREDICTIONS_PATH)
+    parser.add_argument("--no-save", action="store_true", help="print the forecast without writing it")
+    args = parser.parse_args(argv)
+
+    results = predict_next_72_hours(args.data, args.model_dir)
+    print("\n📈 Next 72 Hours AQI Prediction (every 6th hour):")
+    print(results.iloc[::6].to_string(index=False))
+
+    if not args.no_save:
+        save_predictions(results, args.output)
+    return results
+
+
+if __name__ == "__main__":
+    main()
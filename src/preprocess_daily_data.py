@@ -1,12 +1,27 @@
 import os
+import io
+import json
+import argparse
 import pandas as pd
 import numpy as np
+from src import data_store
+from src.fetch_data import VALUE_COLUMNS
 
 # -----------------------------
 # Configurable Paths
 # -----------------------------
-RAW_DATA_PATH = "data/karachi_daily_aqi_weather.csv"
+RAW_DATA_PATH = data_store.DB_PATH
 PROCESSED_DATA_PATH = "processed_data/daily_karachi_preprocessed.csv"
+STATE_PATH = "processed_data/preprocess_state.json"
+
+LOG_COLUMNS = ["PM2.5", "CO"]
+IQR_COLUMNS = ["PM10", "SO2", "NO2", "O3", "Temperature", "Humidity", "Precipitation"]
+
+# Incremental mode re-reads this many processed rows: 3 rows of lag history
+# for the first recomputed row + the last 3 rows, whose AQI_t+k targets were
+# only forward-filled until the next days arrived.
+PROVISIONAL_ROWS = 3
+CONTEXT_ROWS = 3 + PROVISIONAL_ROWS
 
 # -----------------------------
 # Utility Functions
@@ -21,85 +36,218 @@ def get_season(month):
     else:
         return "Fall"
 
-def iqr_cap(df, column):
-    Q1 = df[column].quantile(0.25)
-    Q3 = df[column].quantile(0.75)
+def iqr_bounds(series):
+    Q1 = series.quantile(0.25)
+    Q3 = series.quantile(0.75)
     IQR = Q3 - Q1
     lower = Q1 - 1.5 * IQR
     upper = Q3 + 1.5 * IQR
-    return df[column].clip(lower, upper)
+    return float(lower), float(upper)
+
+def iqr_cap(df, column):
+    return df[column].clip(*iqr_bounds(df[column]))
 
 # -----------------------------
-# Preprocessing Pipeline
+# Fitted state (IQR bounds, one-hot categories)
 # -----------------------------
-def preprocess_data():
-    os.makedirs(os.path.dirname(PROCESSED_DATA_PATH), exist_ok=True)
-
-    print("📥 Loading data...")
-    df = pd.read_csv(RAW_DATA_PATH)
-    print(f"✅ Data loaded. Shape: {df.shape}")
+def fit_state(df):
+    # df: deduplicated + forward-filled raw rows
+    dates = pd.to_datetime(df["date"])
+    return {
+        "iqr_bounds": {col: iqr_bounds(df[col]) for col in IQR_COLUMNS if col in df.columns},
+        "season_categories": sorted(dates.dt.month.apply(get_season).unique().tolist()),
+        "weekday_categories": sorted(int(d) for d in dates.dt.weekday.unique()),
+    }
+
+def load_state(state_path=STATE_PATH):
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, "r") as f:
+        return json.load(f)
+
+def save_state(state, state_path=STATE_PATH):
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2)
 
-    print("🧹 Removing duplicates...")
+# -----------------------------
+# Feature engineering (same steps for full and incremental runs)
+# -----------------------------
+def clean_raw(df, verbose=True):
     before = df.shape[0]
     df = df.drop_duplicates()
-    print(f"✅ Duplicates removed: {before - df.shape[0]} rows")
-
-    print("🔧 Filling missing values with forward fill...")
     null_before = df.isnull().sum().sum()
     df = df.ffill()
-    null_after = df.isnull().sum().sum()
-    print(f"✅ Nulls before: {null_before}, after: {null_after}")
+    if verbose:
+        print(f"✅ Duplicates removed: {before - df.shape[0]} rows")
+        print(f"✅ Nulls before: {null_before}, after: {df.isnull().sum().sum()}")
+    return df
+
+def build_features(df, state, verbose=True):
+    log = print if verbose else (lambda *args: None)
+    df = df.copy()
 
-    print("🛠️ Parsing date and extracting features...")
+    log("🛠️ Parsing date and extracting features...")
     df["date"] = pd.to_datetime(df["date"])
     df["month"] = df["date"].dt.month
-    df["weekday"] = df["date"].dt.weekday
-    df["season"] = df["month"].apply(get_season)
+    df["weekday"] = pd.Categorical(df["date"].dt.weekday, categories=state["weekday_categories"])
+    df["season"] = pd.Categorical(df["month"].apply(get_season), categories=state["season_categories"])
 
     if "Next_Day_AQI" in df.columns:
         df.drop(columns=["Next_Day_AQI"], inplace=True)
-        print("🗑️ Dropped column: Next_Day_AQI")
+        log("🗑️ Dropped column: Next_Day_AQI")
 
-    print("🔁 Applying log transform...")
-    for col in ["PM2.5", "CO"]:
+    log("🔁 Applying log transform...")
+    for col in LOG_COLUMNS:
         if col in df.columns:
             df[f"log_{col}"] = np.log1p(df[col])
-            #df.drop(columns=[col], inplace=True)
-            print(f"✅ Log transformed and dropped: {col}")
+            log(f"✅ Log transformed: {col}")
 
-    print("📏 Applying IQR capping...")
-    for col in ["PM10", "SO2", "NO2", "O3", "Temperature", "Humidity", "Precipitation"]:
-        if col in df.columns:
-            df[col] = iqr_cap(df, col)
-            print(f"✅ IQR capped: {col}")
+    log("📏 Applying IQR capping...")
+    for col, (lower, upper) in state["iqr_bounds"].items():
+        df[col] = df[col].clip(lower, upper)
+        log(f"✅ IQR capped: {col}")
 
-    print("🎨 One-hot encoding season and weekday...")
+    log("🎨 One-hot encoding season and weekday...")
     df = pd.get_dummies(df, columns=["season", "weekday"], drop_first=True)
 
-    print("⏭️ Creating future AQI targets...")
+    log("⏭️ Creating future AQI targets...")
     df["AQI_t+1"] = df["AQI"].shift(-1)
     df["AQI_t+2"] = df["AQI"].shift(-2)
     df["AQI_t+3"] = df["AQI"].shift(-3)
 
-    print("➕ Adding lag, rolling, and diff features...")
-    df["AQI_lag_1"] = df["AQI"].shift(1)
-    df["AQI_lag_2"] = df["AQI"].shift(2)
-    df["AQI_roll_mean_3"] = df["AQI"].rolling(3).mean().shift(1)
-    df["AQI_roll_std_3"] = df["AQI"].rolling(3).std().shift(1)
+    log("➕ Adding lag, rolling, and diff features...")
+    # Rolling stats from explicit lags so each row only depends on its own 3-day
+    # window (bit-identical whether computed over the full history or a tail)
+    lags = np.column_stack([df["AQI"].shift(k).to_numpy(dtype=float) for k in (1, 2, 3)])
+    df["AQI_lag_1"] = lags[:, 0]
+    df["AQI_lag_2"] = lags[:, 1]
+    df["AQI_roll_mean_3"] = lags.mean(axis=1)
+    df["AQI_roll_std_3"] = lags.std(axis=1, ddof=1)
     df["AQI_diff"] = df["AQI"].diff().shift(1)
 
-    print("🧹 Final cleanup...")
+    log("🧹 Final cleanup...")
     df = df.ffill()
     df.dropna(inplace=True)
     df = df.sort_values("date").reset_index(drop=True)
+    return df
+
+# -----------------------------
+# Processed file tail access
+# -----------------------------
+def read_tail(path, n_rows, block_size=1 << 16):
+    # Last n_rows of a CSV (plus the byte offset each one starts at), read from the end
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos = end
+        chunk = b""
+        while pos > data_start and chunk.count(b"\n") <= n_rows:
+            pos = max(data_start, pos - block_size)
+            f.seek(pos)
+            chunk = f.read(end - pos)
+
+    lines = chunk.splitlines(keepends=True)
+    if pos > data_start:
+        lines = lines[1:]  # first line may be partial
+    lines = lines[-n_rows:]
+    offsets = []
+    offset = end
+    for line in reversed(lines):
+        offset -= len(line)
+        offsets.append(offset)
+    offsets.reverse()
+
+    tail = pd.read_csv(io.BytesIO(header + b"".join(lines)))
+    return tail, offsets
+
+# -----------------------------
+# Preprocessing Pipeline
+# -----------------------------
+def preprocess_full(conn, reuse_state=False):
+    print("📥 Loading data...")
+    df = data_store.read_range(conn)
+    print(f"✅ Data loaded. Shape: {df.shape}")
+
+    print("🧹 Removing duplicates and forward filling missing values...")
+    df = clean_raw(df)
+
+    state = load_state() if reuse_state else None
+    if state is None:
+        print("📐 Fitting preprocessing state (IQR bounds, categories)...")
+        state = fit_state(df)
+
+    df = build_features(df, state)
     print(f"✅ Final shape after cleanup: {df.shape}")
 
     print("💾 Saving processed data...")
     df.to_csv(PROCESSED_DATA_PATH, index=False)
+    return df, state
+
+
+def preprocess_incremental(conn, state):
+    # Returns False when an incremental update is not possible and a full run is needed
+    if state is None or not os.path.exists(PROCESSED_DATA_PATH):
+        print("ℹ️ No saved preprocessing state, running full preprocessing.")
+        return False
+
+    context, offsets = read_tail(PROCESSED_DATA_PATH, CONTEXT_ROWS)
+    if len(context) < CONTEXT_ROWS:
+        return False
+    last_date = context["date"].iloc[-1]
+    if data_store.fingerprint(conn, last_date) != state.get("raw_fingerprint"):
+        print("ℹ️ Stored history up to the last processed day changed, running full preprocessing.")
+        return False
+
+    next_day = (pd.Timestamp(last_date) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    new_raw = data_store.read_range(conn, start=next_day)
+    if new_raw.empty:
+        print(f"✅ Processed data already up to date ({last_date}).")
+        return True
+    print(f"➕ Preprocessing {len(new_raw)} new day(s) after {last_date}...")
+
+    # Context rows already hold forward-filled (and capped) raw values, so filling and
+    # capping again over context + new rows reproduces exactly what a full run computes
+    frame = pd.concat([context[["date"] + VALUE_COLUMNS], new_raw], ignore_index=True)
+    frame = clean_raw(frame, verbose=False)
+    features = build_features(frame, state, verbose=False)
+
+    first_provisional = CONTEXT_ROWS - PROVISIONAL_ROWS
+    replace_from = pd.Timestamp(context["date"].iloc[first_provisional])
+    features = features[features["date"] >= replace_from]
+
+    with open(PROCESSED_DATA_PATH, "r+b") as f:
+        f.truncate(offsets[first_provisional])
+    features.to_csv(PROCESSED_DATA_PATH, mode="a", header=False, index=False)
+    print(f"✅ Rewrote {PROVISIONAL_ROWS} provisional and appended {len(features) - PROVISIONAL_ROWS} new row(s).")
+    return True
+
+
+def preprocess_data(mode="incremental", reuse_state=False):
+    os.makedirs(os.path.dirname(PROCESSED_DATA_PATH), exist_ok=True)
+    conn = data_store.connect(RAW_DATA_PATH)
+
+    state = load_state()
+    if mode == "incremental" and preprocess_incremental(conn, state):
+        pass
+    else:
+        _, state = preprocess_full(conn, reuse_state=reuse_state)
+
+    # Store content the processed file was built from (older states kept a row count only)
+    state.pop("raw_rows", None)
+    state["raw_fingerprint"] = data_store.fingerprint(conn)
+    save_state(state)
     print(f"🎉 Preprocessing complete. Saved to: {PROCESSED_DATA_PATH}")
 
 # -----------------------------
 # Run the script
 # -----------------------------
 if __name__ == "__main__":
-    preprocess_data()
+    parser = argparse.ArgumentParser(description="Feature engineering for the daily AQI data.")
+    parser.add_argument("--mode", choices=["incremental", "full"], default="incremental",
+                        help="incremental only processes days after the last processed one")
+    parser.add_argument("--reuse-state", action="store_true",
+                        help="full mode: keep the saved IQR bounds/categories instead of refitting")
+    args = parser.parse_args()
+    preprocess_data(args.mode, args.reuse_state)
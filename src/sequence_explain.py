@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from src.model_registry import LSTM_MODEL_DIR, get_artifacts, model_version, predict_batch
+from src.create_lime import SAVE_DIR, cache_key, evict, new_entry_dir, publish_entry, restore_outputs
+from src.feature_pipeline import FEATURE_COLUMNS, SEQ_LEN
+from src.locations import location_path
+
+# -------------------
+# Configs & Paths
+# -------------------
+DATA_PATH = "processed_data/daily_karachi_preprocessed.csv"
+CACHE_DIR = os.path.join(SAVE_DIR, "sequence_cache")
+CACHE_SIZE = 8
+CSV_PATH = os.path.join(SAVE_DIR, "sequence_explanation.csv")
+CSV_NAME = "sequence_explanation.csv"
+META_NAME = "meta.json"
+
+NUM_SAMPLES = 2000     # masked copies of the window, scored in one batch
+KERNEL_WIDTH = 0.25    # on the fraction of masked cells, as LIME's exponential kernel
+RIDGE_ALPHA = 1.0
+RANDOM_STATE = 0
+
+
+# -------------------
+# Masked perturbations of the whole window + weighted linear surrogate
+# -------------------
+def sample_masks(n_samples, n_cells, rng):
+    # Row 0 keeps every cell; each other row keeps a cell with its own random probability,
+    # so the batch covers small and large occlusions
+    keep_prob = rng.random((n_samples, 1))
+    masks = rng.random((n_samples, n_cells)) < keep_prob
+    masks[0] = True
+    return masks
+
+
+def explain_window(model, pipeline, window, baseline, output=0, num_samples=NUM_SAMPLES,
+                   seed=RANDOM_STATE):
+    # window, baseline: scaled (seq_len, n_features). Masked cells are replaced by the
+    # baseline. Returns (contributions (seq_len, n_features) in AQI units, intercept, prediction).
+    if not 0 <= output < pipeline.horizon:
+        raise ValueError(f"output must be in 0..{pipeline.horizon - 1}: this model forecasts "
+                         f"{pipeline.horizon} step(s) ahead, got {output}")
+    seq_len, n_features = window.shape
+    n_cells = seq_len * n_features
+    rng = np.random.default_rng(seed)
+
+    masks = sample_masks(num_samples, n_cells, rng)
+    m = masks.reshape(num_samples, seq_len, n_features)
+    batch = np.where(m, window[np.newaxis], baseline[np.newaxis])
+    y = pipeline.inverse_target(predict_batch(model, batch))[:, output]
+
+    # LIME-style locality weights on the share of cells masked out
+    distance = 1.0 - masks.mean(axis=1)
+    weights = np.exp(-distance ** 2 / KERNEL_WIDTH ** 2)
+
+    # Weighted ridge on the 0/1 mask (centered, so the intercept is not penalized)
+    Z = masks.astype(float)
+    w_sum = weights.sum()
+    z_mean = weights @ Z / w_sum
+    y_mean = weights @ y / w_sum
+    Zc, yc = Z - z_mean, y - y_mean
+    Zw = Zc * weights[:, np.newaxis]
+    coef = np.linalg.solve(Zc.T @ Zw + RIDGE_ALPHA * np.eye(n_cells), Zw.T @ yc)
+    intercept = y_mean - z_mean @ coef
+    return coef.reshape(seq_len, n_features), float(intercept), float(y[0])
+
+
+def to_frame(contributions, feature_columns):
+    # (seq_len, n_features) -> tidy rows: Day ("t-6" .. "t"), Feature, Contribution
+    seq_len = contributions.shape[0]
+    days = [f"t-{seq_len - 1 - i}" if i < seq_len - 1 else "t" for i in range(seq_len)]
+    return pd.DataFrame({
+        "Day": np.repeat(days, len(feature_columns)),
+        "Feature": np.tile(feature_columns, seq_len),
+        "Contribution": contributions.ravel(),
+    })
+
+
+# -------------------
+# Cache (per model version + explained window + settings)
+# -------------------
+def load_cached(key, cache_dir=CACHE_DIR):
+    entry_dir = os.path.join(cache_dir, key)
+    meta_path = os.path.join(entry_dir, META_NAME)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    os.utime(meta_path)  # mark as recently used
+    # The entry's own CSV: the top-level one is overwritten by every later run
+    csv_path = os.path.join(entry_dir, CSV_NAME)
+    return dict(meta, contributions_df=pd.read_csv(csv_path), csv_path=csv_path, cached=True)
+
+
+def store_cached(key, result, cache_dir=CACHE_DIR, cache_size=CACHE_SIZE):
+    entry_dir = os.path.join(cache_dir, key)
+    tmp_dir = new_entry_dir(cache_dir)
+    result["contributions_df"].to_csv(os.path.join(tmp_dir, CSV_NAME), index=False)
+    meta = {k: v for k, v in result.items() if k not in ("contributions_df", "csv_path", "cached")}
+    with open(os.path.join(tmp_dir, META_NAME), "w") as f:
+        json.dump(meta, f, indent=2)
+    publish_entry(tmp_dir, entry_dir)
+    evict(cache_dir, cache_size)
+
+
+def generate_sequence_explanation(use_cache=True, output=0, num_samples=NUM_SAMPLES, root="."):
+    # root: the location whose data/model/outputs to use (see src/locations.py)
+    model_dir = location_path(root, LSTM_MODEL_DIR)
+    cache_dir = location_path(root, CACHE_DIR)
+    csv_path = location_path(root, CSV_PATH)
+    os.makedirs(location_path(root, SAVE_DIR), exist_ok=True)
+    start = time.perf_counter()
+
+    df = pd.read_csv(location_path(root, DATA_PATH))
+    version = model_version(model_dir)
+
+    # Key on the raw last window, so a cache hit never loads the model
+    raw_window = df[FEATURE_COLUMNS].iloc[-SEQ_LEN:].to_numpy(dtype=np.float64)
+    config = {"mode": "sequence", "output": output, "num_samples": num_samples}
+    key = cache_key(version, raw_window, config)
+    if use_cache:
+        cached = load_cached(key, cache_dir)
+        if cached is not None:
+            restore_outputs(cached, os.path.dirname(csv_path), [("csv_path", CSV_NAME)])
+            cached["seconds"] = round(time.perf_counter() - start, 2)
+            return cached
+
+    artifacts = get_artifacts(model_dir)
+    pipeline = artifacts["pipeline"]
+    X_all = pipeline.transform(df)
+    window = X_all[-pipeline.seq_len:]
+    baseline = np.broadcast_to(X_all.mean(axis=0), window.shape)  # "average day" in every masked cell
+
+    contributions, intercept, prediction = explain_window(artifacts["model"], pipeline, window, baseline,
+                                                          output, num_samples)
+    contributions_df = to_frame(contributions, pipeline.feature_columns)
+    contributions_df.to_csv(csv_path, index=False)
+
+    result = {
+        "model_version": version,
+        "window_end": str(df["date"].iloc[-1]),
+        "intercept": intercept,
+        "prediction": prediction,
+        "contributions_df": contributions_df,
+        "csv_path": csv_path,
+        "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "seconds": round(time.perf_counter() - start, 2),
+        "config": config,
+        "cached": False,
+    }
+    store_cached(key, result, cache_dir)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attribute the latest forecast over (day, feature) cells of its input window")
+    parser.add_argument("--output", type=int, default=0, help="forecast output to explain (0 = t+1)")
+    parser.add_argument("--num-samples", type=int, default=NUM_SAMPLES)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = generate_sequence_explanation(not args.no_cache, args.output, args.num_samples)
+    ranked = result["contributions_df"].reindex(
+        result["contributions_df"]["Contribution"].abs().sort_values(ascending=False).index)
+    print(f"Prediction: {result['prediction']:.2f}  Intercept: {result['intercept']:.2f}")
+    print(ranked.head(15).to_string(index=False))
+    print(f"CSV saved to: {result['csv_path']}")
+    print(f"⏱️ Wall time: {result['seconds']}s{' (cached)' if result['cached'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from src import data_store
+from src.fetch_data import VALUE_COLUMNS
+from src.locations import load_locations, location_path
+from src.model_registry import LSTM_MODEL_DIR, stat_stamp, model_version
+from src.predict import DATA_PATH, FORECAST_ARTIFACT_PATH, data_watermark, get_forecast
+
+# -------------------
+# Configs
+# -------------------
+HOST = "127.0.0.1"
+PORT = 8000
+CACHE_SIZE = 256          # serialized responses kept in memory, least recently used are evicted
+HISTORY_DAYS = 30         # /history default range, back from the latest day
+EXPLANATION_KINDS = ["lime", "sequence"]
+STORE_ENDPOINTS = ["current", "history"]  # read the daily store; the others only need processed data + model
+
+# -------------------
+# In-memory state: serialized responses, valid while the location's stamp is unchanged.
+# The stamp is (mtime, size) of the daily store, processed data and forecast artifact and
+# the model version, i.e. a few stat() calls: a cache hit reads no file and runs no model.
+# -------------------
+_responses = OrderedDict()  # (location, endpoint, params) -> (stamp, body, etag)
+_frames = {}                # location -> (stamp, raw daily observations)
+_lock = threading.Lock()
+_build_locks = {}           # key -> lock: concurrent misses on one key build it once, other keys don't wait
+_stats = {"hits": 0, "misses": 0}
+
+
+def has_data(location, endpoint):
+    root = location["root"]
+    path = data_store.DB_PATH if endpoint in STORE_ENDPOINTS else DATA_PATH
+    return os.path.exists(location_path(root, path))
+
+
+def location_stamp(location):
+    root = location["root"]
+    files = stat_stamp([location_path(root, data_store.DB_PATH), location_path(root, DATA_PATH),
+                        location_path(root, FORECAST_ARTIFACT_PATH)])
+    return files, model_version(location_path(root, LSTM_MODEL_DIR))
+
+
+def _lookup(key, stamp):
+    with _lock:
+        entry = _responses.get(key)
+        if entry is None or entry[0] != stamp:
+            return None
+        _responses.move_to_end(key)
+        _stats["hits"] += 1
+        return entry[1], entry[2]
+
+
+def _build(key, stamp, build, location, params):
+    # Runs in the thread pool, so the event loop keeps serving cache hits meanwhile
+    with _lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+    with build_lock:
+        cached = _lookup(key, stamp)
+        if cached is not None:
+            return cached
+        body = json.dumps(build(location, *params), default=float, allow_nan=False).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        with _lock:
+            _responses[key] = (stamp, body, etag)
+            _responses.move_to_end(key)
+            while len(_responses) > CACHE_SIZE:
+                evicted, _ = _responses.popitem(last=False)
+                _build_locks.pop(evicted, None)
+            _stats["misses"] += 1
+        return body, etag
+
+
+# -------------------
+# Response builders (cache misses only)
+# -------------------
+def history_frame(location, stamp):
+    # Observed daily values of a location, read from its daily store once per stamp.
+    # Not the processed data: preprocessing caps and log-transforms the pollutant columns.
+    cached = _frames.get(location["id"])
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    db_path = location_path(location["root"], data_store.DB_PATH)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)  # the service never writes the store
+    try:
+        df = data_store.read_range(conn)[["date"] + VALUE_COLUMNS]
+    finally:
+        conn.close()
+    df["date"] = pd.to_datetime(df["date"])
+    _frames[location["id"]] = (stamp, df)
+    return df
+
+
+def _records(df):
+    # Days missing in the store hold NaN: sent as null, JSON has no NaN
+    df = df.copy()
+    if "date" in df and pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def build_current(location):
+    df = history_frame(location, location_stamp(location))
+    return {"location": location["id"], **_records(df.iloc[-1:])[0]}
+
+
+def build_forecast(location):
+    root = location["root"]
+    data_path = location_path(root, DATA_PATH)
+    model_dir = location_path(root, LSTM_MODEL_DIR)
+    results = get_forecast(data_path, model_dir, location_path(root, FORECAST_ARTIFACT_PATH))
+    return {
+        "location": location["id"],
+        "model_version": model_version(model_dir),
+        "data_watermark": data_watermark(data_path),
+        "forecast": _records(results),
+    }
+
+
+def build_history(location, start, end):
+    df = history_frame(location, location_stamp(location))
+    end = pd.Timestamp(end) if end else df["date"].iloc[-1]
+    start = pd.Timestamp(start) if start else end - pd.Timedelta(days=HISTORY_DAYS - 1)
+    rows = df[(df["date"] >= start) & (df["date"] <= end)]
+    return {"location": location["id"], "start": start.strftime("%Y-%m-%d"), "end": end.strftime("%Y-%m-%d"),
+            "rows": _records(rows)}
+
+
+def build_explanation(location, kind):
+    # Both explanations keep their own disk cache keyed on model version + input window,
+    # so a restart of the service does not recompute them
+    if kind == "sequence":
+        from src.sequence_explain import generate_sequence_explanation
+        result = generate_sequence_explanation(root=location["root"])
+        return {"location": location["id"], "kind": kind, "model_version": result["model_version"],
+                "window_end": result["window_end"], "intercept": result["intercept"],
+                "prediction": result["prediction"],
+                "contributions": _records(result["contributions_df"])}
+
+    from src.create_lime import generate_lime  # LIME is only imported on a cache miss
+    result = generate_lime(root=location["root"])
+    return {"location": location["id"], "kind": kind, "intercept": result["intercept"],
+            "prediction": result["pred_local"],
+            "contributions": _records(result["features_df"])}
+
+
+# -------------------
+# HTTP app
+# -------------------
+def create_app(locations=None):
+    locations = locations or load_locations()
+    default_location = next(iter(locations))
+
+    def get_location(location_id):
+        location = locations.get(location_id)
+        if location is None:
+            raise HTTPException(404, f"Unknown location {location_id!r}, expected one of {list(locations)}")
+        return location
+
+    async def respond(request, location_id, endpoint, build, *params):
+        location = get_location(location_id)
+        if not has_data(location, endpoint):
+            what = "daily store" if endpoint in STORE_ENDPOINTS else "processed data"
+            raise HTTPException(503, f"No {what} for {location_id} yet")
+        stamp = location_stamp(location)
+        key = (location_id, endpoint, params)
+        cached = _lookup(key, stamp)
+        if cached is None:
+            cached = await run_in_threadpool(_build, key, stamp, build, location, params)
+        body, etag = cached
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Load every location's model and forecast before the first request
+        for location_id, location in locations.items():
+            for endpoint, build in (("current", build_current), ("forecast", build_forecast)):
+                if not has_data(location, endpoint):
+                    print(f"⚠️ {location_id}: no data for /{endpoint} yet, not warmed up")
+                    continue
+                await run_in_threadpool(_build, (location_id, endpoint, ()), location_stamp(location),
+                                        build, location, ())
+        print(f"✅ Serving {len(locations)} location(s): {', '.join(locations)}")
+        yield
+
+    app = FastAPI(title="Karachi AQI forecast service", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        with _lock:
+            cache = dict(_stats, entries=len(_responses))
+        return {"status": "ok", "locations": list(locations), "cache": cache}
+
+    @app.get("/current")
+    async def current(request: Request, location: str = default_location):
+        return await respond(request, location, "current", build_current)
+
+    @app.get("/forecast")
+    async def forecast(request: Request, location: str = default_location):
+        return await respond(request, location, "forecast", build_forecast)
+
+    @app.get("/history")
+    async def history(request: Request, location: str = default_location,
+                      start: str = Query(None, description="YYYY-MM-DD (default: end - 29 days)"),
+                      end: str = Query(None, description="YYYY-MM-DD (default: latest day)")):
+        try:
+            start = pd.Timestamp(start).strftime("%Y-%m-%d") if start else None
+            end = pd.Timestamp(end).strftime("%Y-%m-%d") if end else None
+        except ValueError:
+            raise HTTPException(400, "start and end must be dates (YYYY-MM-DD)")
+        if start and end and start > end:
+            raise HTTPException(400, "start is after end")
+        return await respond(request, location, "history", build_history, start, end)
+
+    @app.get("/explanation")
+    async def explanation(request: Request, location: str = default_location, kind: str = "lime"):
+        if kind not in EXPLANATION_KINDS:
+            raise HTTPException(400, f"kind must be one of {EXPLANATION_KINDS}")
+        return await respond(request, location, "explanation", build_explanation, kind)
+
+    return app
+
+
+# -------------------
+# CLI entry point
+# -------------------
+def main(argv=None):
+    import uvicorn
+
+    locations = load_locations()
+    parser = argparse.ArgumentParser(description="Serve current AQI, forecasts, history and explanations over HTTP")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--locations", nargs="*", choices=list(locations), default=list(locations))
+    parser.add_argument("--access-log", action="store_true", help="log every request (slower)")
+    args = parser.parse_args(argv)
+
+    app = create_app({loc_id: locations[loc_id] for loc_id in args.locations})
+    uvicorn.run(app, host=args.host, port=args.port, access_log=args.access_log, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+# -------------------
+# Configs
+# -------------------
+APP_PATH = "app.py"
+STARTUP_BUDGET_MS = 2500  # module-level imports of app.py, i.e. before first paint
+TOP_N = 15
+
+# Must never be imported before first paint
+FORBIDDEN_AT_STARTUP = ["matplotlib", "seaborn", "lime", "kaleido", "sklearn"]
+# Must not be imported by any tab (serving runs the NumPy model, see src/numpy_lstm.py)
+FORBIDDEN_IN_APP = ["tensorflow", "keras"]
+RENDER_TIMEOUT = 300  # seconds for one full run of the app
+
+# Renders the app once (Streamlit runs every tab body) in a fresh interpreter and
+# reports which forbidden modules the run actually loaded: catches runtime imports
+# (inside functions, src modules, unpickling) that the static view above cannot see
+RENDER_CODE = """
+import sys, json
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2])).run()
+print(json.dumps({"exceptions": [e.message for e in at.exception],
+                  "loaded": [m for m in sys.argv[3].split(",") if m in sys.modules]}))
+"""
+
+
+# -------------------
+# Which imports happen where in app.py
+# -------------------
+def _import_lines(nodes):
+    lines = []
+    for node in nodes:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(ast.unparse(node))
+    return lines
+
+
+def app_imports(app_path=APP_PATH):
+    # -> {"startup": [...module-level import statements], "tab 0": [...], ...}
+    with open(app_path, "r") as f:
+        tree = ast.parse(f.read())
+
+    stages = {"startup": _import_lines(tree.body)}
+    for node in tree.body:
+        if not isinstance(node, ast.With):
+            continue
+        label = ast.unparse(node.items[0].context_expr)  # e.g. tabs[2]
+        stages[label] = _import_lines(ast.walk(node))
+    return stages
+
+
+# -------------------
+# python -X importtime
+# -------------------
+def measure(statements):
+    # Runs the statements in a fresh interpreter and parses the -X importtime log
+    # -> list of (cumulative_us, self_us, depth, module) in import order
+    code = "\n".join(statements) or "pass"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return rows
+
+
+def summarize(rows, skip=frozenset()):
+    # Top-level modules (not imported by another module) add up to the total
+    top_level = [r for r in rows if r[2] == 0 and r[3] not in skip]
+    total_ms = sum(r[0] for r in top_level) / 1000
+    modules = {r[3] for r in rows}
+    return total_ms, top_level, modules
+
+
+def report(app_path=APP_PATH, budget_ms=STARTUP_BUDGET_MS, top_n=TOP_N):
+    # Prints the per-module breakdown per stage; returns a list of problems.
+    # Stages are measured cumulatively in script order (startup, then tabs[0], ...),
+    # so each tab shows only what it adds on top of what already ran.
+    problems = []
+    _, _, seen = summarize(measure([]))  # interpreter's own imports (encodings, site, ...)
+    statements = []
+
+    for stage, stage_statements in app_imports(app_path).items():
+        statements += stage_statements
+        total_ms, top_level, modules = summarize(measure(statements), skip=seen)
+        new_modules = modules - seen
+        seen = seen | modules
+        print(f"\n⏱️ {stage}: +{total_ms:.0f} ms (+{len(new_modules)} modules)")
+        for cumulative_us, _, _, name in sorted(top_level, reverse=True)[:top_n]:
+            print(f"   {cumulative_us / 1000:8.1f} ms  {name}")
+
+        forbidden = FORBIDDEN_IN_APP + (FORBIDDEN_AT_STARTUP if stage == "startup" else [])
+        bad = sorted(m for m in forbidden if m in new_modules)
+        if bad:
+            problems.append(f"{stage} imports {', '.join(bad)}")
+        if stage == "startup" and total_ms > budget_ms:
+            problems.append(f"startup imports take {total_ms:.0f} ms, budget is {budget_ms} ms")
+    return problems
+
+
+# -------------------
+# Full render (streamlit.testing AppTest)
+# -------------------
+def render_check(app_path=APP_PATH, timeout=RENDER_TIMEOUT):
+    # -> list of problems
+    print(f"\n🖼️ Rendering {app_path} once...")
+    proc = subprocess.run([sys.executable, "-c", RENDER_CODE, app_path, str(timeout), ",".join(FORBIDDEN_IN_APP)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return [f"rendering {app_path} failed:\n{proc.stderr[-2000:]}"]
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    problems = [f"rendering raised: {message}" for message in result["exceptions"]]
+    if result["loaded"]:
+        problems.append(f"rendering {app_path} loads {', '.join(result['loaded'])}")
+    else:
+        print(f"   no {', '.join(FORBIDDEN_IN_APP)} in sys.modules after a full run")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time breakdown of app.py startup and tabs")
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--no-render", action="store_true", help="static import checks only")
+    args = parser.parse_args(argv)
+
+    problems = report(args.app, args.budget_ms, args.top)
+    if not args.no_render:
+        problems += render_check(args.app)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("\n✅ Startup imports within budget, no TensorFlow in the app")
+
+
+if __name__ == "__main__":
+    main()
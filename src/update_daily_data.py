@@ -1,103 +1,69 @@
-import requests
-import pandas as pd
 from datetime import date, timedelta
-import os
+import argparse
+from src.fetch_data import LAT, LON, TIMEZONE, fetch_range, aggregate_daily
+from src import data_store
 
-LAT, LON = 24.8607, 67.0011
-TIMEZONE = "Asia/Karachi"
-DATA_PATH = "data/karachi_daily_aqi_weather.csv"
+LOOKBACK_DAYS = 30  # how far back catch-up looks for days missed by failed runs
 
-def fetch_today_data(today):
-    air_url = (
-        "https://air-quality-api.open-meteo.com/v1/air-quality"
-        f"?latitude={LAT}&longitude={LON}"
-        f"&start_date={today}&end_date={today}"
-        "&hourly=us_aqi,pm2_5,pm10,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide,ozone"
-        f"&timezone={TIMEZONE}"
-    )
-    weather_url = (
-        "https://archive-api.open-meteo.com/v1/archive"
-        f"?latitude={LAT}&longitude={LON}"
-        f"&start_date={today}&end_date={today}"
-        "&hourly=temperature_2m,relative_humidity_2m,precipitation"
-        f"&timezone={TIMEZONE}"
-    )
 
+def fetch_days(days, session=None, lat=LAT, lon=LON, timezone=TIMEZONE, log=print):
+    # One request per endpoint covering all requested days, aggregated and filtered to them
+    start, end = min(days), max(days)
     try:
-        air_response = requests.get(air_url).json()
-        weather_response = requests.get(weather_url).json()
-
-        if "hourly" not in air_response or "hourly" not in weather_response:
-            raise ValueError("Missing 'hourly' data in API response")
-
-        air_data = air_response["hourly"]
-        weather_data = weather_response["hourly"]
-
-        if not air_data or not weather_data:
+        hourly = fetch_range(start, end, session, lat=lat, lon=lon, timezone=timezone)
+        daily = aggregate_daily(hourly)
+        daily = daily[daily["date"].isin(days)]
+        if daily.empty:
             raise ValueError("Empty hourly data")
-
     except Exception as e:
-        print(f"❌ Failed to fetch data for {today}: {e}")
+        log(f"❌ Failed to fetch data for {start}..{end}: {e}")
         return None
+    return daily
+
+
+def update_store(conn, lookback_days=LOOKBACK_DAYS, session=None, lat=LAT, lon=LON, timezone=TIMEZONE,
+                 db_path=data_store.DB_PATH, log=print):
+    # Fetches the days missing from the last lookback_days into the store; returns how many were written.
+    # session: shared requests session (src/update_locations.py updates all locations through one)
+    today = date.today()
+    missing = data_store.missing_dates(conn, today - timedelta(days=lookback_days), today)
+    if not missing:
+        log(f"✅ Data for {today.isoformat()} already exists.")
+        return 0
+    if missing != [today.isoformat()]:
+        log(f"🩹 Catching up {len(missing)} missing day(s): {missing[0]} .. {missing[-1]}")
+
+    # Fetch all missing days at once
+    df_new = fetch_days(missing, session, lat, lon, timezone, log)
+    if df_new is None:
+        log("❌ Skipping update due to fetch error.")
+        return 0
+    log(f"✅ Fetched data for {len(df_new)} day(s)")
 
-    df_air = pd.DataFrame(air_data)
-    df_weather = pd.DataFrame(weather_data)
-    df = pd.merge(df_air, df_weather, on="time")
-    df["time"] = pd.to_datetime(df["time"])
-    daily = df.set_index("time").resample("D").mean()
-
-    daily["date"] = today
-    daily = daily.rename(columns={
-        'us_aqi': 'AQI',
-        'pm2_5': 'PM2.5',
-        'pm10': 'PM10',
-        'nitrogen_dioxide': 'NO2',
-        'sulphur_dioxide': 'SO2',
-        'carbon_monoxide': 'CO',
-        'ozone': 'O3',
-        'temperature_2m': 'Temperature',
-        'relative_humidity_2m': 'Humidity',
-        'precipitation': 'Precipitation'
-    })
-
-    return daily[['date', 'AQI', 'PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3', 'Temperature', 'Humidity', 'Precipitation']]
-
-def main():
-    today = date.today().isoformat()
+    # Write only the new days, in a single transaction
+    data_store.upsert_days(conn, df_new)
+    log(f"✅ Updated store: {db_path}")
 
-    # Load existing data
-    if os.path.exists(DATA_PATH):
-        df_old = pd.read_csv(DATA_PATH)
-        if today in df_old['date'].values:
-            print(f"✅ Data for {today} already exists.")
-            return
-    else:
-        df_old = pd.DataFrame()
+    still_missing = sorted(set(missing) - set(df_new["date"]))
+    if still_missing:
+        log(f"⚠️ No data returned for: {', '.join(still_missing)}")
+    return len(df_new)
 
-    # Fetch today's data
-    df_new = fetch_today_data(today)
-    if df_new is None:
-        print("❌ Skipping update due to fetch error.")
-        return
-    print(f"✅ Fetched data for {today}")
 
-    # Append and re-save
-    df_combined = pd.concat([df_old, df_new], ignore_index=True)
-    df_combined = df_combined.sort_values('date')
-    df_combined["Next_Day_AQI"] = df_combined["AQI"].shift(-1)
-    df_combined.to_csv(DATA_PATH, index=False)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append new days of Karachi AQI & weather to the daily store.")
+    parser.add_argument("--db", default=data_store.DB_PATH)
+    parser.add_argument("--lookback-days", type=int, default=LOOKBACK_DAYS,
+                        help="fill gaps this many days back (0 = only today)")
+    parser.add_argument("--export-csv", action="store_true", help=f"also rewrite {data_store.SEED_CSV_PATH}")
+    args = parser.parse_args(argv)
 
-    print(f"✅ Updated file: {DATA_PATH}")
+    conn = data_store.connect(args.db)
+    update_store(conn, args.lookback_days, db_path=args.db)
 
+    if args.export_csv:
+        data_store.export_csv(conn)
 
-    # Append and re-save
-    df_combined = pd.concat([df_old, df_new], ignore_index=True)
-    df_combined = df_combined.sort_values('date')
-    df_combined["Next_Day_AQI"] = df_combined["AQI"].shift(-1)
-    df_combined.to_csv(DATA_PATH, index=False)
-
-    print(f"✅ Updated file: {DATA_PATH}")
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,59 @@
+import argparse
+import pandas as pd
+from datetime import date, timedelta
+from src.fetch_data import HOURLY_PATH, LAT, LON, TIMEZONE, VALUE_COLUMNS, fetch_range
+from src.preprocess_daily_data import read_tail
+
+# Hours of the last LOOKBACK_DAYS days are fetched again and replace what the file holds:
+# the weather archive fills in recent hours with a delay of a few days
+LOOKBACK_DAYS = 3
+
+
+def update_hourly(path=HOURLY_PATH, lookback_days=LOOKBACK_DAYS, session=None, lat=LAT, lon=LON,
+                  timezone=TIMEZONE, log=print):
+    # -> number of new hours appended to path
+    # Tail of the file back to the refetch start, plus the byte offset of each row
+    tail, offsets = read_tail(path, (lookback_days + 2) * 24)
+    tail["time"] = pd.to_datetime(tail["time"])
+    start = tail["time"].iloc[-1].date() - timedelta(days=lookback_days)
+    today = date.today()
+
+    try:
+        fetched = fetch_range(start, today, session, lat=lat, lon=lon, timezone=timezone)
+    except Exception as e:
+        log(f"❌ Failed to fetch hourly data for {start}..{today}: {e}")
+        return 0
+
+    # Drop hours that have not happened yet (the air-quality API returns today's forecast)
+    # and hours without an AQI reading
+    now = pd.Timestamp.now(tz=timezone).tz_localize(None).floor("h")
+    fetched = fetched[(fetched["time"] <= now) & fetched["AQI"].notna()]
+
+    # Re-fetched hours replace the stored ones; stored hours the API no longer returns are kept
+    keep = tail["time"] >= pd.Timestamp(start)
+    if not keep.any():
+        log(f"⚠️ Hourly file ends before {start}, rebuild it with python -m src.fetch_data")
+        return 0
+    first = int(keep.idxmax())
+    rewrite = pd.concat([tail[first:], fetched]).drop_duplicates("time", keep="last").sort_values("time")
+    new_hours = int((rewrite["time"] > tail["time"].iloc[-1]).sum())
+
+    with open(path, "r+b") as f:
+        f.truncate(offsets[first])
+    rewrite["time"] = rewrite["time"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    rewrite[["time"] + VALUE_COLUMNS].to_csv(path, mode="a", header=False, index=False)
+    log(f"✅ Rewrote {len(tail) - first} recent and appended {new_hours} new hour(s) to {path}")
+    return new_hours
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append new hours of Karachi AQI & weather to the hourly file.")
+    parser.add_argument("--path", default=HOURLY_PATH)
+    parser.add_argument("--lookback-days", type=int, default=LOOKBACK_DAYS)
+    args = parser.parse_args(argv)
+
+    update_hourly(args.path, args.lookback_days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import argparse
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from src import data_store
+from src.fetch_data import HOURLY_PATH, MAX_WORKERS, START_DATE, make_session, backfill, aggregate_daily
+from src.locations import load_locations, location_path
+from src.update_daily_data import update_store
+from src.update_hourly_data import update_hourly
+
+
+# -----------------------------
+# One location: bootstrap its history on first run, then daily + hourly updates
+# -----------------------------
+def update_location(location, session):
+    root = location["root"]
+    coords = {"lat": location["lat"], "lon": location["lon"], "timezone": location["timezone"]}
+
+    def log(msg):
+        print(f"[{location['id']}] {msg}")  # tagged, locations share stdout
+
+    db_path = location_path(root, data_store.DB_PATH)
+    hourly_path = location_path(root, HOURLY_PATH)
+    # Seed only from this location's own CSV, never from another location's
+    conn = data_store.connect(db_path, seed_csv=location_path(root, data_store.SEED_CSV_PATH))
+
+    if data_store.count_days(conn) == 0 or not os.path.exists(hourly_path):
+        # New location: one backfill gives both the hourly file and the daily store
+        log(f"🌱 New location, backfilling from {START_DATE} ...")
+        hourly = backfill(START_DATE, date.today(), session=session, **coords)
+        os.makedirs(os.path.dirname(hourly_path), exist_ok=True)
+        hourly.to_csv(hourly_path, index=False)
+        data_store.upsert_days(conn, aggregate_daily(hourly))
+        log(f"✅ {len(hourly)} hours, {data_store.count_days(conn)} days")
+    else:
+        update_store(conn, session=session, db_path=db_path, log=log, **coords)
+        update_hourly(hourly_path, session=session, log=log, **coords)
+    conn.close()
+
+
+def main(argv=None):
+    locations = load_locations()
+    parser = argparse.ArgumentParser(description="Update the daily store and hourly file of every configured location")
+    parser.add_argument("--locations", nargs="*", choices=list(locations), default=list(locations))
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args(argv)
+
+    # One pooled keep-alive session for every location: the API host is the same
+    selected = [locations[loc_id] for loc_id in args.locations]
+    session = make_session(pool_size=max(args.workers, len(selected)))
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {loc["id"]: pool.submit(update_location, loc, session) for loc in selected}
+
+    failed = []
+    for loc_id, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            print(f"❌ [{loc_id}] update failed: {e}")
+            failed.append(loc_id)
+    if len(failed) == len(selected):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
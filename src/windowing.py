@@ -0,0 +1,66 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# -----------------------------
+# Sliding windows as strided views (no copy of the data)
+# -----------------------------
+def make_windows(X, seq_len, y=None, horizon=1):
+    # Window i covers rows i .. i+seq_len-1 of X; its target is rows
+    # i+seq_len .. i+seq_len+horizon-1 of y, flattened to (n, horizon * n_targets).
+    # X windows come back as a read-only view of shape (n, seq_len, n_features).
+    n = len(X) - seq_len - horizon + 1
+    if n <= 0:
+        raise ValueError(f"Need more than {seq_len + horizon - 1} rows to build windows, got {len(X)}")
+
+    X_win = sliding_window_view(X, seq_len, axis=0)[:n].transpose(0, 2, 1)
+    if y is None:
+        return X_win
+
+    y = np.asarray(y)
+    if y.ndim == 1:
+        y = y[:, np.newaxis]
+    y_win = sliding_window_view(y[seq_len:], horizon, axis=0)[:n]  # (n, n_targets, horizon)
+    return X_win, y_win.transpose(0, 2, 1).reshape(n, -1)
+
+
+def last_window(X, seq_len):
+    # Model input for forecasting from the end of the series: shape (1, seq_len, n_features)
+    return X[np.newaxis, -seq_len:]
+
+
+# -----------------------------
+# Streaming: materialize one batch of windows at a time
+# -----------------------------
+def window_batches(X, y, seq_len, batch_size=32, horizon=1, rng=None):
+    # rng: shuffle window order with this numpy Generator (None keeps time order)
+    X_win, y_win = make_windows(X, seq_len, y, horizon)
+    order = np.arange(len(X_win))
+    if rng is not None:
+        rng.shuffle(order)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        yield X_win[idx], y_win[idx]
+
+
+def window_dataset(X, y, seq_len, batch_size=32, horizon=1, shuffle=False, seed=None, dtype=np.float32):
+    # tf.data pipeline over window_batches: peak memory is one batch of windows
+    # instead of len(X) * seq_len rows
+    import tensorflow as tf
+
+    X = np.asarray(X, dtype=dtype)
+    y = np.asarray(y, dtype=dtype)
+    n_targets = horizon * (1 if y.ndim == 1 else y.shape[1])
+    rng = np.random.default_rng(seed) if shuffle else None  # shared, so each epoch gets a new order
+
+    def generator():
+        yield from window_batches(X, y, seq_len, batch_size, horizon, rng)
+
+    signature = (
+        tf.TensorSpec(shape=(None, seq_len, X.shape[1]), dtype=dtype),
+        tf.TensorSpec(shape=(None, n_targets), dtype=dtype),
+    )
+    # Known length, so Keras can size epochs and validation passes without running dry
+    n_batches = -(-(len(X) - seq_len - horizon + 1) // batch_size)
+    dataset = tf.data.Dataset.from_generator(generator, output_signature=signature)
+    return dataset.apply(tf.data.experimental.assert_cardinality(n_batches)).prefetch(tf.data.AUTOTUNE)